@@ -11,7 +11,12 @@ Key features:
 import logging
 import asyncio
 import time
-from fastapi import APIRouter, HTTPException
+import hashlib
+
+from cachetools import TTLCache
+from fastapi import APIRouter, HTTPException, Request, Response
+import orjson
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from typing import List, Optional
 from datetime import datetime, timezone
 
@@ -23,22 +28,52 @@ from story_generator.models.story import (
     StoryGenerationStartResponse,
     StoryProgressResponse,
     ProgressInfo,
-    SceneWithStatus,
-    SceneStatus
+    SceneWithStatus
 )
 from story_generator.database import db
-from story_generator.config import settings
+from story_generator.config import settings, SCENES_BY_LENGTH
 from story_generator.services import StoryGenerator, ImageGenerator, VoiceGenerator
 from story_generator.utils import PerformanceTracker
 from story_generator.workers import task_manager
-from story_generator.workers.scene_worker import generate_remaining_scenes
-from story_generator.models.story import StoryGenerationStartResponse
+from story_generator.workers.scene_worker import (
+    generate_remaining_scenes,
+    with_sem,
+    IMAGE_SEM,
+    AUDIO_SEM,
+    UPLOAD_SEM
+)
 from story_generator.services.thumbnail_generator import ThumbnailGenerator
 from story_generator.services.character_name_extractor import CharacterNameExtractor
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter()
+# orjson serialize nhanh hơn json stdlib nhiều lần trên payload scene lớn
+router = APIRouter(default_response_class=ORJSONResponse)
+
+_UTC = timezone.utc
+
+
+def _parse_ts(value: str) -> datetime:
+    """Parse timestamp từ Supabase → datetime UTC (1 lần parse, không replace thừa)."""
+    dt = datetime.fromisoformat(value)
+    return dt if dt.tzinfo is not None else dt.replace(tzinfo=_UTC)
+
+# Fire-and-forget tasks: giữ strong reference để không bị GC giữa chừng
+# (không dùng task_manager — start_task cancel task cũ theo story_id)
+_bg_tasks: set = set()
+
+
+def _spawn_bg(coro):
+    """Chạy coroutine nền, tự dọn reference khi xong."""
+    task = asyncio.create_task(coro)
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
+    return task
+
+# Progress cache 1s: N client poll cùng story trong TTL chỉ tốn 1 DB round-trip.
+# Lưu (etag, response) — lock per-story để các poll đồng thời single-flight.
+_progress_cache: TTLCache = TTLCache(maxsize=1024, ttl=1.0)
+_progress_locks: dict = {}
 
 # Initialize services
 story_gen = StoryGenerator()
@@ -58,7 +93,9 @@ async def generate_single_scene(
     character_design: str,
     background_design: str,
     story_id: str,
-    tracker: PerformanceTracker
+    tracker: PerformanceTracker,
+    image_task=None,
+    audio_task=None
 ) -> dict:
     """
     Tạo image + audio cho MỘT scene. 
@@ -88,34 +125,34 @@ async def generate_single_scene(
     scene_num = db_scene["scene_order"]
     scene_id = db_scene["id"]
     scene_metrics = tracker.get_scene_metrics(scene_num)
-    scene_metrics.text_ready_at = time.time()
+    scene_metrics.text_ready_at = time.perf_counter()
     
     try:
-        # ==========================================
-        # Update status = generating
-        # ==========================================
-        await db.update_scene_status(scene_id, "generating")
-        
         # ==========================================
         # Generate image + audio (PARALLEL)
         # ==========================================
-        scene_metrics.image_start = time.time()
-        scene_metrics.audio_start = time.time()
-        
-        image_task = image_gen.generate_image(
-            prompt=db_scene["image_prompt_used"],
-            style=image_style,
-            scene_number=scene_num,
-            character_design=character_design,
-            background_design=background_design
-        )
-        
-        audio_task = voice_gen.generate_audio(
-            text=db_scene["paragraph_text"],
-            voice=voice or settings.tts_voice
-        )
-        
-        # Wait for both
+        # (Không còn ghi status="generating" — progress endpoint chỉ đọc
+        # completed scenes nên transient state này chỉ tốn 1 round trip/scene)
+        scene_metrics.image_start = time.perf_counter()
+        scene_metrics.audio_start = time.perf_counter()
+
+        # Task có thể được kick off SỚM bởi caller (pipelining) — chỉ tự tạo khi chưa có
+        if image_task is None:
+            image_task = with_sem(IMAGE_SEM, image_gen.generate_image(
+                prompt=db_scene["image_prompt_used"],
+                style=image_style,
+                scene_number=scene_num,
+                character_design=character_design,
+                background_design=background_design
+            ))
+
+        if audio_task is None:
+            audio_task = with_sem(AUDIO_SEM, voice_gen.generate_audio(
+                text=db_scene["paragraph_text"],
+                voice=voice or settings.tts_voice
+            ))
+
+        # Wait for both (mỗi stage gate bằng semaphore riêng)
         image_bytes, (audio_bytes, audio_duration, transcript) = await asyncio.gather(
             image_task,
             audio_task
@@ -126,7 +163,7 @@ async def generate_single_scene(
 
         # ✅ SỬA:  Cho phép audio = None (optional)
         if audio_bytes is None:
-            logger.warning(f"⚠️ Scene {scene_num}:  Audio generation failed, proceeding without audio")
+            logger.warning("⚠️ Scene %s:  Audio generation failed, proceeding without audio", scene_num)
             audio_url = None
             audio_duration = 0.0
             upload_tasks = [
@@ -138,8 +175,8 @@ async def generate_single_scene(
                 db.upload_file("story-audio", f"{story_id}/scene_{scene_num}. mp3", audio_bytes, "audio/mpeg")
             ]
 
-        scene_metrics.image_end = time.time()
-        scene_metrics.audio_end = time.time()
+        scene_metrics.image_end = time.perf_counter()
+        scene_metrics.audio_end = time.perf_counter()
 
         image_time = scene_metrics.image_end - scene_metrics.image_start
         audio_time = scene_metrics.audio_end - scene_metrics.audio_start
@@ -152,35 +189,38 @@ async def generate_single_scene(
         # ==========================================
         # Upload (PARALLEL if audio exists)
         # ==========================================
-        scene_metrics.upload_start = time.time()
+        scene_metrics.upload_start = time.perf_counter()
 
-        upload_results = await asyncio.gather(*upload_tasks)
+        upload_results = await asyncio.gather(
+            *(with_sem(UPLOAD_SEM, task) for task in upload_tasks)
+        )
         image_url = upload_results[0]
         audio_url = upload_results[1] if len(upload_results) > 1 else None
 
-        scene_metrics.upload_end = time.time()
+        scene_metrics.upload_end = time.perf_counter()
         upload_time = scene_metrics.upload_end - scene_metrics.upload_start
 
         if not image_url: 
             raise Exception(f"Image upload failed for scene {scene_num}")
         
         # ==========================================
-        # Update database
+        # Update database — queue vào buffer chung, flush gộp 1 UPSERT
+        # (cùng đường ghi với worker, response không chờ round trip)
         # ==========================================
-        await db.update_scene(scene_id, {
+        db.queue_scene_update({
+            **db_scene,
             "image_url": image_url,
             "audio_url": audio_url,
             "transcript": transcript,
-            "audio_duration": audio_duration
+            "audio_duration": audio_duration,
+            "status": "completed"
         })
-        
-        # Update status = completed
-        await db.update_scene_status(scene_id, "completed")
-        
+
         # Calculate total duration
-        scene_metrics.total_duration = time.time() - scene_metrics.text_ready_at
+        scene_metrics.total_duration = time.perf_counter() - scene_metrics.text_ready_at
         
-        logger.info(f"✅ Scene {scene_num}:  Gen={image_time:.2f}s, Upload={upload_time:.2f}s, Total={scene_metrics.total_duration:.2f}s")
+        logger.info("✅ Scene %s:  Gen=%.2fs, Upload=%.2fs, Total=%.2fs",
+                    scene_num, image_time, upload_time, scene_metrics.total_duration)
         
         # ==========================================
         # Return complete scene data
@@ -191,26 +231,23 @@ async def generate_single_scene(
             "audio_url": audio_url,
             "audio_duration": audio_duration,
             "transcript": transcript,
+            # Tính ở Python — DB không lưu word_count
             "word_count": len(db_scene["paragraph_text"].split()),
             "status": "completed"
         }
         
     except Exception as e:
-        logger. error(f"❌ Scene {scene_num} failed: {e}")
+        logger.error("❌ Scene %s failed: %s", scene_num, e)
         
         # Update status = failed
         await db. update_scene_status(scene_id, "failed", error_message=str(e))
         
         # Still calculate duration
         if scene_metrics.text_ready_at:
-            scene_metrics.total_duration = time.time() - scene_metrics.text_ready_at
+            scene_metrics.total_duration = time.perf_counter() - scene_metrics.text_ready_at
         
         raise
 
-# ========================================
-# API 1: POST /generate
-# Tạo story, trả về scene 1 ngay
-# ========================================
 # ========================================
 # API 1: POST /generate
 # Tạo story, trả về scene 1 ngay
@@ -225,9 +262,12 @@ async def generate_story(request: StoryRequest):
     2. MOBILE MODE:  User provides 'character', 'place', 'adventure', 'lesson'
     """
     
-    logger.info("=" * 70)
-    logger.info(f"📚 NEW STORY REQUEST")
-    
+    # isEnabledFor: production chạy WARNING → khỏi build banner strings
+    _log_info = logger.isEnabledFor(logging.INFO)
+    if _log_info:
+        logger.info("=" * 70)
+        logger.info("📚 NEW STORY REQUEST")
+
     # ========================================
     # DETERMINE MODE & BUILD FINAL PROMPT
     # ========================================
@@ -279,7 +319,7 @@ async def generate_story(request: StoryRequest):
         )
         
         if not is_valid:
-            logger.error(f"❌ Mobile params validation failed: {error_msg}")
+            logger.error("❌ Mobile params validation failed: %s", error_msg)
             raise HTTPException(status_code=400, detail=error_msg)
         
         # Build prompt from mobile params
@@ -291,25 +331,32 @@ async def generate_story(request: StoryRequest):
             child_name=request.child_name
         )
         
-        logger.info(f"   Mode:  MOBILE")
-        logger.info(f"   Character: {request.character}")
-        logger.info(f"   Place: {request.place}")
-        logger.info(f"   Adventure: {request.adventure}")
-        logger.info(f"   Lesson: {request.lesson}")
-        logger.info(f"   → Built prompt: {final_prompt}")
-    
+        if _log_info:
+            logger.info("   Mode:  MOBILE")
+            logger.info("   Character: %s", request.character)
+            logger.info("   Place: %s", request.place)
+            logger.info("   Adventure: %s", request.adventure)
+            logger.info("   Lesson: %s", request.lesson)
+            logger.info("   → Built prompt: %s", final_prompt)
+
     else:
         # ✅ LEGACY MODE
         final_prompt = request.prompt. strip()
-        logger.info(f"   Mode: LEGACY")
-        logger.info(f"   Prompt: {final_prompt[: 60]}...")
-    
-    logger.info(f"   Length: {request.story_length. value} ({get_scene_count_from_length(request.story_length.value)} scenes)")
-    logger.info("=" * 70)
+        if _log_info:
+            logger.info("   Mode: LEGACY")
+            logger.info("   Prompt: %s...", final_prompt[:60])
+
+    if _log_info:
+        logger.info("   Length: %s (%s scenes)", request.story_length.value,
+                    get_scene_count_from_length(request.story_length.value))
+        logger.info("=" * 70)
     
     # Initialize performance tracker
     tracker = PerformanceTracker(story_id="pending")
-    story_id = "pending" 
+    story_id = "pending"
+    scene1_image_task = None
+    scene1_audio_task = None
+    thumbnail_task = None
 
     try:
         # ========================================
@@ -328,7 +375,25 @@ async def generate_story(request: StoryRequest):
         character_design = story_data.get("character_design", "")
         background_design = story_data.get("background_design", "")
         total_scenes = len(story_data["scenes"])
-        
+
+        # ========================================
+        # STEP 1.5: Kick off scene-1 assets NGAY khi có text
+        # ========================================
+        # Image + audio của scene 1 không cần scene row trong DB →
+        # chạy song song với STEP 2-3, STEP 4 chỉ việc await
+        _scene1 = story_data["scenes"][0]
+        scene1_image_task = asyncio.create_task(with_sem(IMAGE_SEM, image_gen.generate_image(
+            prompt=_scene1["image_prompt"],
+            style=request.image_style,
+            scene_number=1,
+            character_design=character_design,
+            background_design=background_design
+        )))
+        scene1_audio_task = asyncio.create_task(with_sem(AUDIO_SEM, voice_gen.generate_audio(
+            text=_scene1["text"],
+            voice=request.voice or settings.tts_voice
+        )))
+
         # ========================================
         # STEP 2: Save Story to Database
         # ========================================
@@ -347,87 +412,104 @@ async def generate_story(request: StoryRequest):
             created_story = await db.create_story(story_record)
             story_id = created_story["id"]
             tracker.story_id = story_id  # ✅ FIX: Update tracker
-            logger.info(f"✅ Story saved: {story_id}")
+            logger.info("✅ Story saved: %s", story_id)
         
         # ✅ THÊM MỚI:  STEP 2. 5: Generate Thumbnail & Extract Character Name
-        with tracker.track_step("thumbnail_generation"):
-            from story_generator.services.thumbnail_generator import ThumbnailGenerator
-            from story_generator.services.character_name_extractor import CharacterNameExtractor
-            
-            thumbnail_gen = ThumbnailGenerator()
-            char_extractor = CharacterNameExtractor(db)
-            
-            # Extract character name (with background context for better detection)
-            character_name = char_extractor.extract_name_from_design(
-                character_design,
-                background_design
-            )
-            
-            # Check uniqueness (optional - có thể bỏ nếu không cần)
-            if character_name:
-                is_unique, suggested_name = await char_extractor.check_name_uniqueness(
-                    character_name,
-                    settings.default_user_id
-                )
-                if not is_unique and suggested_name:
-                    logger.warning(f"⚠️ Character name '{character_name}' exists, using '{suggested_name}'")
-                    character_name = suggested_name
-            
-            # Create short title
-            short_title = story_data["title"][: 27] + "..." if len(story_data["title"]) > 30 else story_data["title"]
-            
-            # Generate thumbnail
-            thumbnail_bytes = await thumbnail_gen.generate_thumbnail(
-                title=story_data["title"],
-                short_title=short_title,
-                character_design=character_design,
-                background_design=background_design,
-                story_tone=request.story_tone.value
-            )
-            
-            # Upload thumbnail
-            thumbnail_url = None
-            if thumbnail_bytes: 
-                thumbnail_path = f"{story_id}/thumbnail.webp"
-                thumbnail_url = await db.upload_file(
-                    "story-images",
-                    thumbnail_path,
-                    thumbnail_bytes,
-                    "image/webp"
+        # Thumbnail KHÔNG nằm trên critical path của scene 1 → chạy nền,
+        # song song với STEP 3 + STEP 4, chỉ await trước khi build response
+        async def _thumbnail_and_character():
+            with tracker.track_step("thumbnail_generation"):
+                # Extract character name (with background context for better detection)
+                character_name = char_extractor.extract_name_from_design(
+                    character_design,
+                    background_design
                 )
-            
-            # Update story with thumbnail data
-            if thumbnail_url:
-                await db.update_story_thumbnail(
-                    story_id=story_id,
-                    thumbnail_url=thumbnail_url,
-                    short_title=short_title,
-                    character_name=character_name
+
+                # Create short title
+                short_title = story_data["title"][: 27] + "..." if len(story_data["title"]) > 30 else story_data["title"]
+
+                # Uniqueness check (DB) và thumbnail render độc lập nhau
+                # → gather thay vì chờ tuần tự
+                async def _check_uniqueness():
+                    if not character_name:
+                        return True, None
+                    return await char_extractor.check_name_uniqueness(
+                        character_name,
+                        settings.default_user_id
+                    )
+
+                (is_unique, suggested_name), thumbnail_bytes = await asyncio.gather(
+                    _check_uniqueness(),
+                    thumbnail_gen.generate_thumbnail(
+                        title=story_data["title"],
+                        short_title=short_title,
+                        character_design=character_design,
+                        background_design=background_design,
+                        story_tone=request.story_tone.value
+                    )
                 )
-                logger.info(f"✅ Thumbnail & Character '{character_name}' updated for story")
+
+                if character_name and not is_unique and suggested_name:
+                    logger.warning("⚠️ Character name '%s' exists, using '%s'", character_name, suggested_name)
+                    character_name = suggested_name
+
+                # Upload thumbnail
+                thumbnail_url = None
+                if thumbnail_bytes:
+                    thumbnail_path = f"{story_id}/thumbnail.webp"
+                    thumbnail_url = await db.upload_file(
+                        "story-images",
+                        thumbnail_path,
+                        thumbnail_bytes,
+                        "image/webp"
+                    )
+
+                # Update story with thumbnail data
+                if thumbnail_url:
+                    await db.update_story_thumbnail(
+                        story_id=story_id,
+                        thumbnail_url=thumbnail_url,
+                        short_title=short_title,
+                        character_name=character_name
+                    )
+                    logger.info("✅ Thumbnail & Character '%s' updated for story", character_name)
+
+                return thumbnail_url, short_title, character_name
+
+        thumbnail_task = asyncio.create_task(_thumbnail_and_character())
         
         # ========================================
         # STEP 3: Save Scenes to Database
         # ========================================
         with tracker.track_step("scenes_save_database", count=len(story_data["scenes"])):
-            scenes_records = []
-            for scene in story_data["scenes"]:
-                scenes_records.append({
+            # Hoist invariants ra khỏi loop — không lookup settings/request mỗi scene
+            _uid = settings.default_user_id
+            _img_style = request.image_style or "Pixar style, 3D render, cute, vibrant colors"
+            _voice = request.voice or settings.tts_voice
+
+            scenes_records = [
+                {
                     "story_id": story_id,
-                    "user_id": settings.default_user_id,
+                    "user_id": _uid,
                     "scene_order": scene["scene_number"],
                     "paragraph_text": scene["text"],
                     "image_prompt_used": scene["image_prompt"],
                     "image_url": "",
                     "audio_url": "",
-                    "image_style": request.image_style or "Pixar style, 3D render, cute, vibrant colors",
-                    "narration_voice": request.voice or settings.tts_voice,
-                    "status": "pending" 
-                })
+                    "image_style": _img_style,
+                    "narration_voice": _voice,
+                    # word_count KHÔNG gửi lên DB: scenes chưa có column này
+                    # (schema change cần migration — xem chunk2-12), tính ở
+                    # Python khi build response
+                    "status": "pending"
+                }
+                for scene in story_data["scenes"]
+            ]
             
-            await db.create_scenes_bulk(scenes_records)
-            db_scenes = await db.get_story_scenes(story_id)
-            logger.info(f"✅ {len(db_scenes)} scenes saved to database (status=pending)")
+            # INSERT đã return rows (Prefer: return=representation) → khỏi SELECT lại
+            db_scenes = await db.create_scenes_bulk(scenes_records)
+            db_scenes.sort(key=lambda s: s["scene_order"])
+            logger.info("✅ %s scenes saved to database (status=pending)", len(db_scenes))
         
 
         # ========================================
@@ -446,11 +528,13 @@ async def generate_story(request: StoryRequest):
                 character_design,
                 background_design,
                 story_id,
-                tracker
+                tracker,
+                image_task=scene1_image_task,
+                audio_task=scene1_audio_task
             )
             
-            # Update story progress: 1/6
-            await db.update_story_progress(story_id, 1, total_scenes)
+            # Update story progress: 1/6 — fire-and-forget, khỏi chắn response
+            _spawn_bg(db.update_story_progress(story_id, 1, total_scenes))
 
 
         # ========================================
@@ -485,21 +569,22 @@ async def generate_story(request: StoryRequest):
         #logger.info("✅ Background worker started")
         
         # ========================================
-        # STEP 6: Log Performance
+        # STEP 6: Log Performance (deferred — sau khi response đã đi)
         # ========================================
         logger.info("")
-        tracker.log_summary()
+        asyncio.get_running_loop().call_soon(tracker.log_summary)
         
         # ========================================
         # STEP 7: Return Response (Scene 1 only)
         # ========================================
-        updated_story = await db.get_story(story_id)
+        # Đợi thumbnail task (thường đã xong từ lâu nhờ chạy song song)
+        thumbnail_url, short_title, character_name = await thumbnail_task
         return StoryGenerationStartResponse(
             story_id=story_id,
             title=story_data["title"],
-            short_title=updated_story.get("short_title"),          # ✅ THÊM
-            thumbnail_url=updated_story.get("thumbnail_url"),      # ✅ THÊM
-            character_name=updated_story.get("character_name"),    # ✅ THÊM
+            short_title=short_title,          # ✅ THÊM
+            thumbnail_url=thumbnail_url,      # ✅ THÊM
+            character_name=character_name,    # ✅ THÊM
             status="generating",
             progress=ProgressInfo(
                 completed=1,
@@ -507,7 +592,7 @@ async def generate_story(request: StoryRequest):
                 percentage=round((1 / total_scenes) * 100, 1)
             ),
             scenes=[
-                SceneGenerated(
+                SceneGenerated.model_construct(
                     id=scene_1_complete["id"],
                     story_id=story_id,
                     scene_order=1,
@@ -528,19 +613,20 @@ async def generate_story(request: StoryRequest):
         
     except Exception as e:
         logger.error("=" * 70)
-        logger. error(f"❌ ERROR: {e}", exc_info=True)
+        logger.error("❌ ERROR: %s", e, exc_info=True)
         logger.error("=" * 70)
-        
-        # Update story status = failed
+
+        # Dọn các asset task đã kick off sớm nhưng chưa ai await
+        # (gồm cả thumbnail — không để nó ghi đè story đang mark failed)
+        for _task in (scene1_image_task, scene1_audio_task, thumbnail_task):
+            if _task is not None and not _task.done():
+                _task.cancel()
+
+        # Update story status = failed (1 UPDATE gộp cả error_message,
+        # fire-and-forget để không delay HTTPException về client)
         if story_id and story_id != "pending":
-            try:
-                await db.update_story_status(story_id, "failed")
-                await db.client.table("stories").update({
-                    "error_message": str(e)
-                }).eq("id", story_id).execute()
-            except:
-                pass
-        
+            _spawn_bg(db.update_story_status(story_id, "failed", error_message=str(e)))
+
         # Log partial metrics
         if tracker:
             tracker.log_summary()
@@ -553,7 +639,12 @@ async def generate_story(request: StoryRequest):
 # Lấy progress + scenes đã hoàn thành
 # ========================================
 @router. get("/{story_id}/progress", response_model=StoryProgressResponse)
-async def get_story_progress(story_id: str):
+async def get_story_progress(
+    story_id: str,
+    request: Request,
+    response: Response,
+    since: int = 0
+):
     """
     API 2: Lấy progress của story đang tạo. 
     
@@ -599,174 +690,251 @@ async def get_story_progress(story_id: str):
     
     try:
         # ==========================================
-        # 1. Lấy story với progress
-        # ==========================================
-        story = await db.get_story_with_progress(story_id)
-        
-        if not story:
-            raise HTTPException(status_code=404, detail="Story not found")
-        
-        # ==========================================
-        # 2.  Lấy completed scenes
-        # ==========================================
-        completed_scenes = await db.get_completed_scenes(story_id)
-        
-        # ==========================================
-        # 3. Calculate progress
-        # ==========================================
-        total = story.get("scenes_total", 6)
-        completed_count = len(completed_scenes)
-        percentage = (completed_count / total * 100) if total > 0 else 0
-        
-        # ==========================================
-        # 4. Estimate remaining time
-        # ==========================================
-        # Giả sử mỗi scene mất ~8s (average)
-        # Nếu còn 3 scenes → ~24s
-        remaining_scenes = total - completed_count
-        estimated_time = remaining_scenes * 8 if story["status"] == "generating" else 0
-        
+        # 0. TTL cache (1s): nhiều client cùng poll 1 story → share 1 DB fetch
+        #    (chỉ cache full response, delta ?since= thì mỗi client một payload)
         # ==========================================
-        # 5. Convert scenes to SceneWithStatus
-        # ==========================================
-        scenes_with_status = []
-        for scene in completed_scenes:
-            scenes_with_status.append(
-                SceneWithStatus(
-                    id=scene["id"],
-                    story_id=scene["story_id"],
-                    scene_order=scene["scene_order"],
-                    paragraph_text=scene["paragraph_text"],
-                    image_prompt_used=scene["image_prompt_used"],
-                    image_url=scene["image_url"],
-                    audio_url=scene["audio_url"],
-                    audio_duration=scene.get("audio_duration"), 
-                    transcript=scene.get("transcript"),
-                    image_style=scene.get("image_style"),
-                    narration_voice=scene.get("narration_voice"),
-                    word_count=len(scene["paragraph_text"].split()) if scene.get("paragraph_text") else None,  
-                    status=SceneStatus(scene. get("status", "completed")),
-                    error_message=scene.get("error_message"),
-                    started_at=scene.get("started_at"),
-                    completed_at=scene.get("completed_at")
-                )
+        if since == 0:
+            cached = _progress_cache.get(story_id)
+            if cached is not None:
+                cached_etag, cached_resp = cached
+                if request.headers.get("if-none-match") == cached_etag:
+                    return Response(status_code=304)
+                response.headers["ETag"] = cached_etag
+                return cached_resp
+
+        # Single-flight: các poll đến cùng lúc đợi 1 lần build duy nhất.
+        # story_id là input tùy ý từ client → bound dict lại: quá ngưỡng thì
+        # dọn các lock đang rảnh (story treo "generating" / ID không tồn tại)
+        if len(_progress_locks) > 1024:
+            for _sid, _lock in list(_progress_locks.items()):
+                if not _lock.locked():
+                    _progress_locks.pop(_sid, None)
+
+        lock = _progress_locks.setdefault(story_id, asyncio.Lock())
+        async with lock:
+            if since == 0:
+                cached = _progress_cache.get(story_id)
+                if cached is not None:
+                    cached_etag, cached_resp = cached
+                    if request.headers.get("if-none-match") == cached_etag:
+                        return Response(status_code=304)
+                    response.headers["ETag"] = cached_etag
+                    return cached_resp
+
+            # ==========================================
+            # 1. Lấy story với progress
+            # ==========================================
+            story = await db.get_story_with_progress(story_id)
+
+            if not story:
+                # Không giữ lock cho ID không tồn tại — client gửi gì cũng được
+                _progress_locks.pop(story_id, None)
+                raise HTTPException(status_code=404, detail="Story not found")
+
+            # ==========================================
+            # 1.5. ETag: payload không đổi giữa 2 lần poll → 304, khỏi fetch
+            #      scenes + build SceneWithStatus + encode JSON
+            # ==========================================
+            etag = hashlib.blake2b(
+                f"{story['status']}:{story.get('scenes_completed', 0)}:{story.get('updated_at', '')}".encode(),
+                digest_size=8
+            ).hexdigest()
+
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304)
+
+            response.headers["ETag"] = etag
+
+            # ==========================================
+            # 2.  Lấy completed scenes (delta nếu client gửi ?since=<max order đã có>)
+            # ==========================================
+            completed_scenes = await db.get_completed_scenes(story_id, since_order=since)
+
+            # ==========================================
+            # 3. Calculate progress
+            # ==========================================
+            total = story.get("scenes_total", 6)
+            # Với delta poll, len() không còn là tổng số completed → dùng counter trên story
+            completed_count = (
+                story.get("scenes_completed", 0) if since > 0 else len(completed_scenes)
             )
-        
-        # ==========================================
-        # 6. Return response
-        # ==========================================
-        return StoryProgressResponse(
-            story_id=story_id,
-            title=story["title"],
-            status=story["status"],
-            progress=ProgressInfo(
-                completed=completed_count,
-                total=total,
-                percentage=round(percentage, 1)
-            ),
-            scenes=scenes_with_status,
-            estimated_time_remaining=estimated_time if estimated_time > 0 else None,
-            error_message=story.get("error_message")
-        )
-        
+            percentage = (completed_count / total * 100) if total > 0 else 0
+
+            # ==========================================
+            # 4. Estimate remaining time
+            # ==========================================
+            # Giả sử mỗi scene mất ~8s (average)
+            # Nếu còn 3 scenes → ~24s
+            remaining_scenes = total - completed_count
+            estimated_time = remaining_scenes * 8 if story["status"] == "generating" else 0
+
+            # ==========================================
+            # 5. Convert scenes to SceneWithStatus
+            # ==========================================
+            # from_trusted: data từ DB của mình, đã validate → skip validation
+            scenes_with_status = [
+                SceneWithStatus.from_trusted(scene) for scene in completed_scenes
+            ]
+
+            # Cursor chỉ tiến qua prefix LIÊN TỤC: scenes chạy parallel nên
+            # có thể completed {1,2,4,5} khi 3 còn đang chạy — nếu trả max
+            # order (5) làm ?since= thì scene 3 không bao giờ tới client.
+            # Scene 4,5 sẽ được gửi lại ở poll sau (client upsert theo order).
+            last_seen_order = since
+            for scene in completed_scenes:
+                if scene["scene_order"] == last_seen_order + 1:
+                    last_seen_order += 1
+                else:
+                    break
+
+            # ==========================================
+            # 6. Build response (+ cache cho các poll trong TTL)
+            # ==========================================
+            progress_response = StoryProgressResponse.from_trusted({
+                "story_id": story_id,
+                "title": story["title"],
+                "status": story["status"],
+                "progress": {
+                    "completed": completed_count,
+                    "total": total,
+                    "percentage": round(percentage, 1)
+                },
+                "scenes": scenes_with_status,
+                "estimated_time_remaining": estimated_time if estimated_time > 0 else None,
+                "error_message": story.get("error_message"),
+                # Client chain polls: gửi last_seen_order làm ?since= lần sau → payload O(Δ)
+                "delta_only": since > 0,
+                "last_seen_order": last_seen_order
+            })
+
+            if since == 0:
+                _progress_cache[story_id] = (etag, progress_response)
+
+            # Story xong rồi → dọn lock, khỏi giữ reference mãi
+            if story["status"] in ("completed", "failed"):
+                _progress_locks.pop(story_id, None)
+
+            return progress_response
+
     except HTTPException:
         raise
     except Exception as e:
-        logger. error(f"❌ Failed to get progress: {e}")
+        logger.error("❌ Failed to get progress: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ========================================
+# API 2b: GET /{story_id}/events (SSE)
+# Push progress thay vì client poll mỗi 2s
+# ========================================
+@router.get("/{story_id}/events")
+async def story_events(story_id: str):
+    """
+    SSE stream cho progress — thay thế polling.
+
+    Client dùng EventSource; server chỉ emit khi progress THAY ĐỔI,
+    nên mỗi update xuống client trong ~1s mà không tốn N request poll.
+
+    Events:
+    - progress: {storyId, status, completed, total, percentage}
+    - done: emit cuối cùng khi status = completed/failed
+    """
+
+    async def event_stream():
+        last_key = None
+        while True:
+            story = await db.get_story_with_progress(story_id)
+            if not story:
+                yield 'event: error\ndata: {"error": "Story not found"}\n\n'
+                return
+
+            status = story["status"]
+            completed = story.get("scenes_completed", 0)
+            total = story.get("scenes_total", 6)
+            key = (status, completed)
+
+            if key != last_key:
+                payload = orjson.dumps({
+                    "storyId": story_id,
+                    "status": status,
+                    "completed": completed,
+                    "total": total,
+                    "percentage": round(completed / total * 100, 1) if total else 0
+                }).decode()
+                yield f"event: progress\ndata: {payload}\n\n"
+                last_key = key
+
+            if status in ("completed", "failed"):
+                yield f"event: done\ndata: {payload}\n\n"
+                return
+
+            await asyncio.sleep(1.0)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ========================================
 # READ ENDPOINTS
 # ========================================
 
 @router.get("/{story_id}", response_model=StoryResponse)
-async def get_story(story_id: str):
-    """Get story by ID."""
-    story = await db.get_story(story_id)
+async def get_story(story_id: str, request: Request, response: Response):
+    """Get story by ID (story + scenes trong 1 round trip)."""
+    story = await db.get_story_with_scenes(story_id)
     if not story:
         raise HTTPException(status_code=404, detail="Story not found")
-    
-    scenes = await db.get_story_scenes(story_id)
-    
-    return StoryResponse(
-        id=story["id"],
-        user_id=story["user_id"],
-        title=story["title"],
-        story_length=story["story_length"],
-        story_tone=story["story_tone"],
-        theme_selected=story["theme_selected"],
-        status=story["status"],
-        cover_image_url=story.get("cover_image_url"),
-        created_at=datetime.fromisoformat(story["created_at"]).replace(tzinfo=timezone.utc),
-        updated_at=datetime.fromisoformat(story["updated_at"]).replace(tzinfo=timezone.utc),
-        scenes=[
-            SceneGenerated(
-                id=scene["id"],
-                story_id=scene["story_id"],
-                scene_order=scene["scene_order"],
-                paragraph_text=scene["paragraph_text"],
-                image_prompt_used=scene["image_prompt_used"],
-                image_url=scene["image_url"],
-                audio_url=scene["audio_url"],
-                image_style=scene.get("image_style"),
-                narration_voice=scene.get("narration_voice")
-            )
-            for scene in scenes
-        ]
-    )
 
+    # ETag như /progress: story completed là immutable → client revisit
+    # chỉ tốn 1 câu 304, khỏi build + encode full scenes payload
+    etag = hashlib.blake2b(
+        f"{story['status']}:{story.get('updated_at', '')}".encode(),
+        digest_size=8
+    ).hexdigest()
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304)
+
+    response.headers["ETag"] = etag
+
+    # from_trusted: DB row → model, construct đệ quy scenes, skip validation
+    return StoryResponse.from_trusted({
+        **story,
+        "created_at": _parse_ts(story["created_at"]),
+        "updated_at": _parse_ts(story["updated_at"])
+    })
 
-@router.get("/", response_model=List[StoryListItem])
-async def list_stories(limit: int = 10):
-    """List stories."""
-    stories = await db.get_user_stories(settings.default_user_id, limit)
-    
-    result = []
-    for story in stories:
-        scenes = await db.get_story_scenes(story["id"])
-        result.append(
-            StoryListItem(
-                id=story["id"],
-                title=story["title"],
-                theme_selected=story["theme_selected"],
-                status=story["status"],
-                cover_image_url=story.get("cover_image_url"),
-                created_at=datetime.fromisoformat(story["created_at"]).replace(tzinfo=timezone.utc),
-                scene_count=len(scenes)
-            )
-        )
-    
-    return result
 
 @router.get("/", response_model=List[StoryListItem])
-async def get_user_stories(
+async def list_stories(
     user_id: Optional[str] = None,
     limit: int = 20
 ):
-    """Get list of user's stories with thumbnails."""
-    
+    """List user's stories (with thumbnails) - 1 query duy nhất."""
+
     uid = user_id or settings.default_user_id
-    
+
     stories = await db.get_user_stories_with_thumbnails(uid, limit)
-    
-    # Format response
-    result = []
-    for story in stories:
-        result.append(StoryListItem(
+
+    # scene_count lấy từ cột stories.scenes_total → KHÔNG query scenes per story nữa
+    return [
+        StoryListItem.model_construct(
             id=story["id"],
             title=story["title"],
-            short_title=story. get("short_title"),
+            short_title=story.get("short_title"),
             thumbnail_url=story.get("thumbnail_url"),
             character_name=story.get("character_name"),
             theme_selected=story["theme_selected"],
             status=story["status"],
             cover_image_url=story.get("cover_image_url"),
-            created_at=story["created_at"],
-            scene_count=None  # Có thể query riêng nếu cần
-        ))
-    
-    return result
+            created_at=_parse_ts(story["created_at"]),
+            scene_count=story.get("scenes_total")
+        )
+        for story in stories
+    ]
 def get_scene_count_from_length(story_length: str) -> int:
     """Helper to get scene count."""
-    return {"short": 6, "medium": 10, "long": 14}.get(story_length, 6)
+    return SCENES_BY_LENGTH.get(story_length, 6)
@@ -3,10 +3,19 @@ Configuration management using Pydantic Settings.
 Loads environment variables from .env file.
 """
 
+from pydantic import PrivateAttr
 from pydantic_settings import BaseSettings, SettingsConfigDict
+from types import MappingProxyType
 from typing import Literal, Optional
 import os
 
+# Hằng số module-level (read-only): không alloc dict mới mỗi lần truy cập
+SCENES_BY_LENGTH = MappingProxyType({
+    "short": 6,
+    "medium": 10,
+    "long": 14
+})
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
@@ -49,6 +58,12 @@ class Settings(BaseSettings):
     default_story_length: Literal["short", "medium", "long"] = "short"
     default_num_scenes: int = 6
     max_scenes: int = 12
+
+    # NEW - Cache story text theo request (OFF mặc định: production muốn
+    # mỗi request một story khác nhau, chỉ bật cho demo/testing)
+    enable_story_cache: bool = False
+    story_cache_ttl: int = 3600
+    story_cache_size: int = 128
     
     # =================================
     # IMAGE GENERATION
@@ -60,6 +75,15 @@ class Settings(BaseSettings):
     # NEW - Retry settings (FIX CHO LỖI SSL)
     max_image_retries: int = 3
     max_upload_retries: int = 3
+
+    # NEW - Concurrency limits per stage (image / audio / upload
+    # hit các API khác nhau → giới hạn riêng, không gate chung)
+    image_concurrency: int = 5
+    audio_concurrency: int = 3
+    upload_concurrency: int = 8
+
+    # NEW - Số scene chạy đồng thời trong background worker
+    scene_concurrency: int = 3
     
     # =================================
     # VOICE SETTINGS
@@ -74,31 +98,34 @@ class Settings(BaseSettings):
         return self.environment == "development"
     
     @property
-    def scenes_by_length(self) -> dict[str, int]:
-        """Return number of scenes based on story length."""
-        return {
-            "short": 6,
-            "medium": 10,
-            "long": 14
-        }
+    def scenes_by_length(self) -> MappingProxyType:
+        """Return number of scenes based on story length (shared constant)."""
+        return SCENES_BY_LENGTH
     
-    # NEW - Helper to find credentials file
-    @property
-    def credentials_path(self) -> str:
-        """Get full path to Google Cloud credentials."""
-        if not self.google_application_credentials:
-            return ""
-        
+    # NEW - Credentials path resolve MỘT LẦN lúc init
+    # (trước đây mỗi lần truy cập là 2 syscall os.path.exists)
+    _credentials_path: str = PrivateAttr(default="")
+
+    def model_post_init(self, __context) -> None:
+        """Resolve đường dẫn Google Cloud credentials một lần duy nhất."""
+        cred = self.google_application_credentials
+        if not cred:
+            self._credentials_path = ""
+            return
+
         # Check current directory first
-        if os.path.exists(self.google_application_credentials):
-            return self.google_application_credentials
-        
+        if os.path.exists(cred):
+            self._credentials_path = cred
+            return
+
         # Check parent directory
-        parent_path = os.path.join(". .", self.google_application_credentials)
-        if os.path. exists(parent_path):
-            return parent_path
-        
-        return self.google_application_credentials
+        parent_path = os.path.join("..", cred)
+        self._credentials_path = parent_path if os.path.exists(parent_path) else cred
+
+    @property
+    def credentials_path(self) -> str:
+        """Get full path to Google Cloud credentials (đã resolve sẵn)."""
+        return self._credentials_path
 
 
 # Global settings instance
@@ -4,16 +4,29 @@ Handles connection to Supabase and provides helper methods.
 FIXED: SSL errors, timeouts, retry logic. 
 """
 
+from cachetools import TTLCache
 from supabase import create_client, Client
+from supabase.lib.client_options import SyncClientOptions
 from story_generator. config import settings
 import logging
 import asyncio
-from typing import Optional, Dict, Any, List
+import re
+from typing import AsyncIterator, Optional, Dict, Any, List, Union
 from datetime import datetime, timezone
 import httpx
 
 logger = logging.getLogger(__name__)
 
+# Classifier cho retry: lỗi SSL/connection thì đáng retry với backoff
+_SSL_ERR_RE = re.compile(r"ssl|eof|connection|timeout|reset", re.IGNORECASE)
+
+_UTC = timezone.utc
+
+
+def _now_iso() -> str:
+    """Timestamp UTC dạng ISO — tzinfo cache sẵn, utcnow() thì deprecated."""
+    return datetime.now(_UTC).isoformat(timespec="milliseconds")
+
 
 class Database:
     """Supabase database manager with enhanced error handling."""
@@ -23,7 +36,9 @@ class Database:
         
         # Create custom HTTP client with better timeout and connection settings
         # This fixes SSL and timeout errors
-        self.http_client = httpx.AsyncClient(
+        # Pool + keep-alive dùng chung cho PostgREST / Storage / Auth
+        # → không handshake TCP/TLS lại mỗi request
+        self.http_client = httpx.Client(
             timeout=httpx.Timeout(
                 connect=10.0,    # Connection timeout
                 read=30.0,       # Read timeout (increased for large files)
@@ -31,20 +46,63 @@ class Database:
                 pool=5.0
             ),
             limits=httpx.Limits(
-                max_connections=100,
-                max_keepalive_connections=50
+                max_connections=1000,
+                max_keepalive_connections=100
             ),
             # Retry on connection errors
-            transport=httpx.AsyncHTTPTransport(retries=2)
+            transport=httpx.HTTPTransport(retries=2)
         )
-        
+
         self.client: Client = create_client(
             settings.supabase_url,
-            settings.supabase_key
+            settings.supabase_key,
+            options=SyncClientOptions(httpx_client=self.http_client)
+        )
+
+        # Async client riêng cho Storage upload: gọi thẳng REST endpoint,
+        # không qua sync SDK + thread hop, pool keep-alive dùng lại connection
+        self.async_http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=10.0, read=30.0, write=30.0, pool=5.0),
+            limits=httpx.Limits(
+                max_connections=1000,
+                max_keepalive_connections=100
+            ),
+            transport=httpx.AsyncHTTPTransport(retries=2)
         )
         
+        # Buffer cho batched scene updates (flush gộp sau debounce window)
+        self._scene_update_queue: list[Dict[str, Any]] = []
+        self._scene_flush_task: Optional[asyncio.Task] = None
+
+        # Cache progress row 500ms: burst poll từ nhiều client chỉ tốn
+        # 1 query; writer pop key ngay khi counter/status thay đổi
+        self._story_cache: TTLCache = TTLCache(maxsize=1024, ttl=0.5)
+
+        # Single-flight: các miss đồng thời cho cùng story chỉ query 1 lần,
+        # request sau await chung Future của request đầu
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # Prefetch cache: story sắp xong → kéo sẵn scenes để GET detail
+        # ngay sau transition "completed" không tốn round trip scenes
+        self._scenes_cache: TTLCache = TTLCache(maxsize=256, ttl=10.0)
+        self._prefetch_tasks: set = set()
+
+        # Cap upload in-flight NGAY TẠI Database: mọi caller (scenes,
+        # thumbnail, ...) đều bị gate, không spam TLS handshake → hết
+        # đường vào retry branch 2s/4s/8s vì SSL reset
+        self._upload_sem = asyncio.Semaphore(settings.upload_concurrency)
+
         logger.info("✅ Supabase client initialized with enhanced settings")
     
+    async def _execute(self, query):
+        """
+        Chạy sync PostgREST query trên threadpool.
+
+        supabase-py sync block cả event loop khi .execute() — to_thread
+        đẩy xuống default executor để các request khác vẫn chạy song song.
+        """
+        return await asyncio.to_thread(query.execute)
+
     # =================================
     # STORIES TABLE
     # =================================
@@ -52,34 +110,48 @@ class Database:
     async def create_story(self, story_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new story record."""
         try:
-            response = self.client.table("stories").insert(story_data).execute()
+            response = await self._execute(self.client.table("stories").insert(story_data))
             
             if response.data and len(response.data) > 0:
-                logger.info(f"✅ Story created: {response.data[0]['id']}")
+                logger.debug("✅ Story created: %s", response.data[0]['id'])
                 return response. data[0]
             
             raise Exception("No data returned from insert")
             
         except Exception as e:
-            logger.error(f"❌ Error creating story: {e}")
+            logger.error("❌ Error creating story: %s", e)
             raise
     
     async def get_story(self, story_id: str) -> Optional[Dict[str, Any]]:
-        """Get story by ID."""
+        """Get story by ID (single-flight: miss đồng thời chung 1 query)."""
+        inflight = self._inflight.get(story_id)
+        if inflight is not None:
+            return await inflight
+
+        future: asyncio.Future = asyncio.get_running_loop().create_future()
+        self._inflight[story_id] = future
+
+        result = None
         try:
-            response = self.client.table("stories")\
-                .select("*")\
-                .eq("id", story_id)\
-                .execute()
-            
-            if response. data and len(response.data) > 0:
-                return response.data[0]
-            
-            return None
-            
+            response = await self._execute(
+                self.client.table("stories")
+                .select("*")
+                .eq("id", story_id)
+            )
+
+            result = response.data[0] if response.data else None
+
         except Exception as e:
-            logger. error(f"❌ Error fetching story {story_id}: {e}")
-            return None
+            logger.error("❌ Error fetching story %s: %s", story_id, e)
+        finally:
+            self._inflight.pop(story_id, None)
+            # Resolve ngay trong finally: leader có thể bị cancel giữa query
+            # (CancelledError là BaseException) — followers đang await future
+            # không được phép treo vĩnh viễn
+            if not future.done():
+                future.set_result(result)
+
+        return result
     
     async def update_story_status(
         self, 
@@ -92,7 +164,7 @@ class Database:
         try:
             update_data = {
                 "status": status, 
-                "updated_at": datetime.utcnow().isoformat()
+                "updated_at": _now_iso()
             }
             
             if cover_image_url:
@@ -100,16 +172,18 @@ class Database:
             
             update_data. update(kwargs)
             
-            self.client.table("stories")\
-                .update(update_data)\
-                .eq("id", story_id)\
-                . execute()
+            await self._execute(
+                self.client.table("stories")
+                .update(update_data)
+                .eq("id", story_id)
+            )
             
-            logger. info(f"✅ Story {story_id} status updated to: {status}")
+            self._story_cache.pop(story_id, None)
+            logger.debug("✅ Story %s status updated to: %s", story_id, status)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Error updating story status: {e}")
+            logger.error("❌ Error updating story status: %s", e)
             return False
     
     async def get_user_stories(
@@ -119,17 +193,18 @@ class Database:
     ) -> List[Dict[str, Any]]:
         """Get all stories for a user."""
         try:
-            response = self.client.table("stories")\
-                .select("*")\
-                .eq("user_id", user_id)\
-                .order("created_at", desc=True)\
-                .limit(limit)\
-                .execute()
+            response = await self._execute(
+                self.client.table("stories")
+                .select("*")
+                .eq("user_id", user_id)
+                .order("created_at", desc=True)
+                .limit(limit)
+            )
             
             return response.data or []
             
         except Exception as e:
-            logger.error(f"❌ Error fetching user stories: {e}")
+            logger.error("❌ Error fetching user stories: %s", e)
             return []
     
     # =================================
@@ -139,73 +214,192 @@ class Database:
     async def create_scenes_bulk(self, scenes_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Bulk insert scenes and return created records."""
         try:
-            response = self.client.table("scenes").insert(scenes_data).execute()
-            logger.info(f"✅ {len(scenes_data)} scenes created")
+            response = await self._execute(self.client.table("scenes").insert(scenes_data))
+            logger.debug("✅ %s scenes created", len(scenes_data))
             return response.data or []
             
         except Exception as e:
-            logger.error(f"❌ Error creating scenes: {e}")
+            logger.error("❌ Error creating scenes: %s", e)
             raise
     
     async def update_scene(self, scene_id: str, data: dict):
         """
-        Update scene with image, audio URLs, and transcript. 
-        
+        Update scene with image, audio URLs, transcript and status.
+
+        GỘP 1 ROUND TRIP: status đi chung payload với assets, không cần
+        gọi thêm update_scene_status (2 UPDATE → 1 UPDATE mỗi scene).
+
         Args:
             scene_id: Scene ID
-            data: Dict with keys:  image_url, audio_url, transcript
-        
+            data: Dict with keys:  image_url, audio_url, transcript, status, error_message
+
         Returns:
             Updated scene record
         """
         update_data = {}
-        
+
         # Add fields conditionally
         if data.get("image_url"):
             update_data["image_url"] = data["image_url"]
-        
+
         if data.get("audio_url"):
             update_data["audio_url"] = data["audio_url"]
-        
-        if "audio_duration" in data:  
+
+        if "audio_duration" in data:
             update_data["audio_duration"] = data["audio_duration"]
 
-        if "transcript" in data:  
+        if "transcript" in data:
             update_data["transcript"] = data["transcript"]
-        
+
+        # Status + timestamps trong cùng một UPDATE
+        status = data.get("status")
+        if status:
+            update_data["status"] = status
+            if status == "generating":
+                update_data["started_at"] = _now_iso()
+            elif status == "completed":
+                update_data["completed_at"] = _now_iso()
+
+        if data.get("error_message"):
+            update_data["error_message"] = data["error_message"]
+
         if not update_data:
-            logger.warning(f"⚠️ No data to update for scene {scene_id}")
+            logger.warning("⚠️ No data to update for scene %s", scene_id)
             return None
         
         # Update (NO updated_at - not in scenes table)
         try:
-            result = self.client.table("scenes").update(
-                update_data
-            ).eq("id", scene_id).execute()
+            result = await self._execute(
+                self.client.table("scenes").update(update_data).eq("id", scene_id)
+            )
             
             if result. data:
-                logger.info(f"✅ Scene {scene_id} updated: {list(update_data.keys())}")
+                logger.debug("✅ Scene %s updated: %s", scene_id, list(update_data.keys()))
                 return result.data[0]
             
             return None
         
         except Exception as e:
-            logger.error(f"❌ Error updating scene {scene_id}: {e}")
+            logger.error("❌ Error updating scene %s: %s", scene_id, e)
             return None
-    
+
+    async def bulk_update_scenes(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Update nhiều scenes trong MỘT round trip.
+
+        PostgREST không có UPDATE ... WHERE id = ANY(...), nên dùng
+        UPSERT on_conflict=id với FULL rows ({**db_scene, **updates})
+        để tuple INSERT không vi phạm NOT NULL.
+        """
+        try:
+            response = await self._execute(
+                self.client.table("scenes").upsert(rows, on_conflict="id")
+            )
+            logger.debug("✅ Bulk updated %s scenes in 1 round trip", len(rows))
+            return response.data or []
+        except Exception as e:
+            logger.error("❌ Error bulk updating scenes: %s", e)
+            return []
+
+    def queue_scene_update(self, row: Dict[str, Any]):
+        """
+        Buffer một FULL scene row, gộp ghi sau debounce window 100ms.
+
+        Nhiều scene hoàn thành gần nhau (worker chạy parallel) sẽ được
+        flush chung 1 UPSERT thay vì mỗi scene 1 UPDATE round trip.
+        """
+        if row.get("status") == "completed" and not row.get("completed_at"):
+            row["completed_at"] = _now_iso()
+
+        self._scene_update_queue.append(row)
+
+        # Batch đầy (≥16 rows) → flush ngay, không đợi hết debounce window
+        if len(self._scene_update_queue) >= 16:
+            self._scene_flush_task = asyncio.create_task(self._flush_scene_updates(delay=0))
+        elif self._scene_flush_task is None or self._scene_flush_task.done():
+            self._scene_flush_task = asyncio.create_task(self._flush_scene_updates())
+
+    async def _flush_scene_updates(self, delay: float = 0.1):
+        """Debounce (mặc định 100ms) rồi ghi tất cả rows đang buffer trong 1 lần."""
+        if delay:
+            await asyncio.sleep(delay)
+        rows, self._scene_update_queue = self._scene_update_queue, []
+        if rows:
+            await self.bulk_update_scenes(rows)
+
+        # Rows append trong lúc await DB ở trên không có task nào drain
+        # (queue_scene_update thấy task chưa done nên không schedule mới)
+        # → tự nối một flush tiếp theo
+        if self._scene_update_queue:
+            self._scene_flush_task = asyncio.create_task(self._flush_scene_updates())
+
+    async def flush_scene_updates(self):
+        """Đợi mọi scene update đang buffer được ghi xuống DB."""
+        while (self._scene_flush_task and not self._scene_flush_task.done()) or self._scene_update_queue:
+            if self._scene_flush_task and not self._scene_flush_task.done():
+                await self._scene_flush_task
+            else:
+                # Task cũ done nhưng queue còn rows → tự drain thay vì busy-wait
+                await self._flush_scene_updates(delay=0)
+
+    async def _prefetch_scenes(self, story_id: str):
+        """Điền scenes cache trước khi client kịp hỏi (xem get_story_with_progress)."""
+        self._scenes_cache[story_id] = await self.get_story_scenes(story_id)
+
+    async def get_story_with_scenes(self, story_id: str) -> Optional[Dict[str, Any]]:
+        """Get story + all scenes trong MỘT query (PostgREST embedded select)."""
+        # Scenes đã được prefetch lúc story sắp xong → chỉ cần story row
+        cached_scenes = self._scenes_cache.get(story_id)
+        if cached_scenes is not None:
+            story = await self.get_story(story_id)
+            # Chỉ dùng cache khi TẤT CẢ scenes đã completed: mọi row tồn tại
+            # từ bulk insert (status=pending) nên đếm số lượng không đủ —
+            # prefetch bắn từ total-1 nên scene cuối trong cache có thể còn
+            # pending với image_url/audio_url rỗng
+            if (
+                story
+                and len(cached_scenes) == story.get("scenes_total")
+                and all(s.get("status") == "completed" for s in cached_scenes)
+            ):
+                story["scenes"] = cached_scenes
+                return story
+
+        try:
+            response = await self._execute(
+                self.client.table("stories")
+                .select("*, scenes(*)")
+                .eq("id", story_id)
+            )
+
+            if response.data and len(response.data) > 0:
+                story = response.data[0]
+                # Embedded resource không đảm bảo thứ tự → sort tại đây
+                story["scenes"] = sorted(
+                    story.get("scenes") or [],
+                    key=lambda s: s["scene_order"]
+                )
+                return story
+
+            return None
+
+        except Exception as e:
+            logger.error("❌ Error fetching story with scenes %s: %s", story_id, e)
+            return None
+
     async def get_story_scenes(self, story_id: str) -> List[Dict[str, Any]]:
         """Get all scenes for a story, ordered by scene_order."""
         try:
-            response = self.client.table("scenes")\
-                .select("*")\
-                .eq("story_id", story_id)\
-                .order("scene_order", desc=False)\
-                .execute()
+            response = await self._execute(
+                self.client.table("scenes")
+                .select("*")
+                .eq("story_id", story_id)
+                .order("scene_order", desc=False)
+            )
             
             return response.data or []
             
         except Exception as e:
-            logger.error(f"❌ Error fetching scenes for story {story_id}: {e}")
+            logger.error("❌ Error fetching scenes for story %s: %s", story_id, e)
             return []
     
     # =================================
@@ -213,69 +407,78 @@ class Database:
     # =================================
     
     async def upload_file(
-        self, 
-        bucket: str, 
-        path: str, 
-        file_data: bytes,
+        self,
+        bucket: str,
+        path: str,
+        file_data: Union[bytes, AsyncIterator[bytes]],
         content_type: str = "image/png",
         max_retries: int = 2
     ) -> Optional[str]:
         """
         Upload file to Supabase Storage with retry logic.
-        
+
         Args:
             bucket: Storage bucket name
             path: File path in bucket
-            file_data: File bytes
+            file_data: File bytes HOẶC async iterator (streaming —
+                       httpx gửi chunked, không giữ cả file trong RAM)
             content_type: MIME type
             max_retries: Maximum retry attempts
-        
+
         Returns:
             Public URL if successful, None if all retries failed
         """
-        
+
+        upload_url = f"{settings.supabase_url}/storage/v1/object/{bucket}/{path}"
+
+        # Stream chỉ đọc được MỘT lần → không retry được sau khi đã consume
+        if not isinstance(file_data, (bytes, bytearray)):
+            max_retries = 1
+
         for attempt in range(1, max_retries + 1):
             try:
                 # Upload file with upsert (overwrite if exists)
-                upload_response = self.client.storage.from_(bucket).upload(
-                    path=path,
-                    file=file_data,
-                    file_options={
-                        "content-type": content_type,
-                        "upsert": "true"  # Overwrite if file exists
-                    }
-                )
-                
+                # POST thẳng Storage REST API bằng async client → non-blocking,
+                # không cần thread hop qua sync SDK
+                async with self._upload_sem:
+                    response = await self.async_http_client.post(
+                        upload_url,
+                        content=file_data,
+                        headers={
+                            "Authorization": f"Bearer {settings.supabase_key}",
+                            "Content-Type": content_type,
+                            "x-upsert": "true"  # Overwrite if file exists
+                        }
+                    )
+                response.raise_for_status()
+
                 # Get public URL
-                public_url = self.client.storage.from_(bucket).get_public_url(path)
+                public_url = f"{settings.supabase_url}/storage/v1/object/public/{bucket}/{path}"
                 
                 if attempt > 1:
-                    logger.info(f"✅ File uploaded on retry {attempt}: {path}")
+                    logger.info("✅ File uploaded on retry %s: %s", attempt, path)
                 else:
-                    logger.info(f"✅ File uploaded: {path}")
+                    logger.debug("✅ File uploaded: %s", path)
                 
                 return public_url
             
             except Exception as e:
-                error_msg = str(e). lower()
-                
-                # Check error type
-                is_ssl_error = any(keyword in error_msg for keyword in [
-                    "ssl", "eof", "connection", "timeout", "reset"
-                ])
+                # Check error type (regex compile sẵn ở module level)
+                is_ssl_error = bool(_SSL_ERR_RE.search(str(e)))
                 
                 if is_ssl_error and attempt < max_retries:
                     # SSL/Connection error - retry with exponential backoff
                     wait_time = 2 ** attempt  # 2s, 4s, 8s
                     logger.warning(
-                        f"⚠️ Upload error (attempt {attempt}/{max_retries}) for {path}: "
-                        f"{str(e)[:100]}.  Retrying in {wait_time}s..."
+                        "⚠️ Upload error (attempt %s/%s) for %s: %s.  Retrying in %ss...",
+                        attempt, max_retries, path, str(e)[:100], wait_time
                     )
                     await asyncio.sleep(wait_time)
                 else:
                     # Non-retryable error or last attempt
                     logger.error(
-                        f"❌ Upload failed (attempt {attempt}/{max_retries}) for {path}: {e}"
+                        "❌ Upload failed (attempt %s/%s) for %s: %s",
+                        attempt, max_retries, path, e
                     )
                     
                     if attempt >= max_retries:
@@ -284,28 +487,28 @@ class Database:
                     # Short delay before next attempt
                     await asyncio. sleep(1)
         
-        logger.error(f"❌ Upload failed after {max_retries} attempts: {path}")
+        logger.error("❌ Upload failed after %s attempts: %s", max_retries, path)
         return None
     
     async def delete_file(self, bucket: str, path: str) -> bool:
         """Delete file from storage."""
         try:
-            self.client.storage.from_(bucket).remove([path])
-            logger.info(f"✅ File deleted: {path}")
+            await asyncio.to_thread(self.client.storage.from_(bucket).remove, [path])
+            logger.debug("✅ File deleted: %s", path)
             return True
             
         except Exception as e:
-            logger.error(f"❌ Error deleting file {path}: {e}")
+            logger.error("❌ Error deleting file %s: %s", path, e)
             return False
     
     async def list_files(self, bucket: str, folder: str = "") -> List[Dict[str, Any]]:
         """List files in a bucket folder."""
         try:
-            response = self.client.storage.from_(bucket).list(folder)
+            response = await asyncio.to_thread(self.client.storage.from_(bucket).list, folder)
             return response or []
             
         except Exception as e:
-            logger.error(f"❌ Error listing files in {bucket}/{folder}: {e}")
+            logger.error("❌ Error listing files in %s/%s: %s", bucket, folder, e)
             return []
     
     async def get_file_url(self, bucket: str, path: str) -> Optional[str]:
@@ -315,7 +518,7 @@ class Database:
             return url
             
         except Exception as e:
-            logger.error(f"❌ Error getting URL for {path}: {e}")
+            logger.error("❌ Error getting URL for %s: %s", path, e)
             return None
     
     # =================================
@@ -325,23 +528,28 @@ class Database:
     async def health_check(self) -> bool:
         """Check database connection."""
         try:
-            # Simple query to test connection
-            response = self.client.table("stories").select("id").limit(1).execute()
+            # HEAD + count=estimated: chỉ header, không materialize row nào
+            await self._execute(
+                self.client.table("stories").select("id", head=True, count="estimated")
+            )
             logger.info("✅ Database health check passed")
             return True
             
         except Exception as e:
-            logger.error(f"❌ Database health check failed: {e}")
+            logger.error("❌ Database health check failed: %s", e)
             return False
     
     async def close(self):
         """Close HTTP client connections."""
         try:
             if hasattr(self, 'http_client'):
-                await self.http_client.aclose()
+                # Sync client (PostgREST) → close(); async client (storage) → aclose()
+                self.http_client.close()
+            if hasattr(self, 'async_http_client'):
+                await self.async_http_client.aclose()
             logger.info("✅ Database connections closed")
         except Exception as e:
-            logger.error(f"⚠️ Error closing connections: {e}")
+            logger.error("⚠️ Error closing connections: %s", e)
 
 
     # =================================
@@ -357,65 +565,61 @@ class Database:
             completed: Số scenes đã hoàn thành
             total: Tổng số scenes
         """
-        response = self.client.table("stories").update({
-            "scenes_completed": completed,
-            "scenes_total": total,
-            #"updated_at": datetime.now(timezone.utc).isoformat()
-        }).eq("id", story_id).execute()
+        response = await self._execute(
+            self.client.table("stories").update({
+                "scenes_completed": completed,
+                "scenes_total": total,
+                #"updated_at": datetime.now(timezone.utc).isoformat()
+            }).eq("id", story_id)
+        )
         
-        logger.info(f"✅ Story {story_id} progress: {completed}/{total}")
+        self._story_cache.pop(story_id, None)
+        logger.debug("✅ Story %s progress: %s/%s", story_id, completed, total)
         return response. data[0] if response.data else None
 
 
     async def update_scene_status(
-        self, 
-        scene_id: str, 
-        status: str, 
+        self,
+        scene_id: str,
+        status: str,
         error_message: str = None
     ):
         """
-        Cập nhật status của scene.
-        
+        Cập nhật status của scene (thin wrapper quanh update_scene).
+
         Args:
             scene_id: ID của scene
             status: 'pending' | 'generating' | 'completed' | 'failed'
             error_message: Lỗi nếu có
         """
-        update_data = {
+        return await self.update_scene(scene_id, {
             "status": status,
-            #"updated_at": datetime.now(timezone.utc).isoformat()
-        }
-        
-        if status == "generating":
-            update_data["started_at"] = datetime.now(timezone.utc).isoformat()
-        elif status == "completed":
-            update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
-        
-        if error_message:
-            update_data["error_message"] = error_message
-        
-        response = self.client.table("scenes").update(
-            update_data
-        ).eq("id", scene_id).execute()
-        
-        logger.info(f"✅ Scene {scene_id} status: {status}")
-        return response.data[0] if response. data else None
+            "error_message": error_message
+        })
 
     
-    async def get_completed_scenes(self, story_id: str):
+    async def get_completed_scenes(self, story_id: str, since_order: int = 0):
         """
-        Lấy tất cả scenes đã hoàn thành. 
-        
+        Lấy scenes đã hoàn thành (delta theo scene_order).
+
+        Args:
+            story_id: ID của story
+            since_order: chỉ trả scenes có scene_order > since_order
+                         (0 = tất cả — client poll gửi max order đã có)
+
         Returns:
             List các scenes có status='completed'
         """
-        response = self.client.table("scenes") \
+        query = self.client.table("scenes") \
             .select("*") \
             .eq("story_id", story_id) \
-            .eq("status", "completed") \
-            .order("scene_order") \
-            .execute()
-        
+            .eq("status", "completed")
+
+        if since_order > 0:
+            query = query.gt("scene_order", since_order)
+
+        response = await self._execute(query.order("scene_order"))
+
         return response.data if response.data else []
 
 
@@ -427,11 +631,12 @@ class Database:
             story_id: ID của story
             scene_order: Thứ tự scene (1-6)
         """
-        response = self.client.table("scenes") \
-            .select("*") \
-            .eq("story_id", story_id) \
-            .eq("scene_order", scene_order) \
-            .execute()
+        response = await self._execute(
+            self.client.table("scenes")
+            .select("*")
+            .eq("story_id", story_id)
+            .eq("scene_order", scene_order)
+        )
         
         return response. data[0] if response.data else None
 
@@ -464,12 +669,23 @@ class Database:
             Story record + progress_percentage
         """
         try:
-            # Lấy story bình thường
-            story = await self.get_story(story_id)
-            
-            if not story:
+            cached = self._story_cache.get(story_id)
+            if cached is not None:
+                return dict(cached)
+
+            # Projection: chỉ SELECT các cột progress endpoint cần,
+            # không kéo full row (prompt text, JSON columns) mỗi lần poll
+            response = await self._execute(
+                self.client.table("stories")
+                .select("id, title, status, scenes_completed, scenes_total, error_message, updated_at")
+                .eq("id", story_id)
+            )
+
+            if not response.data:
                 return None
-            
+
+            story = response.data[0]
+
             # Tính progress percentage
             completed = story. get("scenes_completed", 0)
             total = story.get("scenes_total", 6)
@@ -477,11 +693,24 @@ class Database:
             
             # Thêm field mới vào story
             story["progress_percentage"] = round(percentage, 1)
-            
-            return story
+
+            # Sắp xong (còn ≤1 scene) → prefetch scenes song song với poll,
+            # GET detail sau transition sẽ ăn cache
+            if (
+                total > 0
+                and completed >= total - 1
+                and story_id not in self._scenes_cache
+                and not any(t.get_name() == story_id for t in self._prefetch_tasks)
+            ):
+                task = asyncio.create_task(self._prefetch_scenes(story_id), name=story_id)
+                self._prefetch_tasks.add(task)
+                task.add_done_callback(self._prefetch_tasks.discard)
+
+            self._story_cache[story_id] = story
+            return dict(story)
             
         except Exception as e:
-            logger.error(f"❌ Failed to get story with progress: {e}")
+            logger.error("❌ Failed to get story with progress: %s", e)
             return None
 
 
@@ -503,18 +732,19 @@ class Database:
             if character_name:
                 update_data["character_name"] = character_name
             
-            result = self.client.table("stories").update(
-                update_data
-            ).eq("id", story_id).execute()
+            result = await self._execute(
+                self.client.table("stories").update(update_data).eq("id", story_id)
+            )
             
             if result.data:
-                logger.info(f"✅ Thumbnail updated:  {story_id}")
+                self._story_cache.pop(story_id, None)
+                logger.debug("✅ Thumbnail updated: %s", story_id)
                 return True
             
             return False
         
         except Exception as e: 
-            logger.error(f"❌ Thumbnail update failed: {e}")
+            logger.error("❌ Thumbnail update failed: %s", e)
             return False
 
 
@@ -526,17 +756,18 @@ class Database:
         """Get user stories with thumbnail data."""
         
         try:
-            response = self.client.table("stories")\
-                .select("id, title, short_title, thumbnail_url, character_name, theme_selected, status, created_at")\
-                .eq("user_id", user_id)\
-                .order("created_at", desc=True)\
-                .limit(limit)\
-                .execute()
+            response = await self._execute(
+                self.client.table("stories")
+                .select("id, title, short_title, thumbnail_url, character_name, theme_selected, status, cover_image_url, scenes_total, created_at")
+                .eq("user_id", user_id)
+                .order("created_at", desc=True)
+                .limit(limit)
+            )
             
             return response.data or []
         
         except Exception as e:
-            logger.error(f"❌ Failed to fetch stories: {e}")
+            logger.error("❌ Failed to fetch stories: %s", e)
             return []
 # Global database instance
 db = Database()
\ No newline at end of file
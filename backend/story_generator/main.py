@@ -3,11 +3,15 @@ FastAPI application entry point.
 Main application with routes and middleware setup.
 """
 
+import asyncio
 import logging
+import logging.handlers
+import queue
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import time
 import warnings
 
@@ -16,10 +20,21 @@ from story_generator.database import db
 from story_generator.api.routes import health, stories
 
 # Configure logging
+# QueueHandler → QueueListener: stream write chạy ở thread riêng,
+# event loop không bao giờ block trên stdout trong lúc tạo scene
+_log_queue = queue.Queue(-1)
+_stream_handler = logging.StreamHandler()
+_stream_handler.setFormatter(
+    logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+)
 logging.basicConfig(
     level=getattr(logging, settings.log_level),
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    handlers=[logging.handlers.QueueHandler(_log_queue)]
+)
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, _stream_handler, respect_handler_level=True
 )
+_log_listener.start()
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("urllib3").setLevel(logging.WARNING)
 logging.getLogger("google.auth").setLevel(logging.WARNING)
@@ -39,8 +54,14 @@ async def lifespan(app: FastAPI):
     # logger.info(f"📍 Environment: {settings.environment}")
     # logger.info(f"🗄️  Supabase URL: {settings.supabase_url}")
     
-    # Test database connection
-    db_health = await db.health_check()
+    # Test database connection + warm up service clients (song song)
+    # Warmup prime sẵn TLS/OAuth → request /generate đầu tiên không chịu handshake
+    db_health, *_ = await asyncio.gather(
+        db.health_check(),
+        stories.story_gen.warmup(),
+        stories.image_gen.warmup(),
+        stories.voice_gen.warmup()
+    )
     if db_health:
         logger.info("✅ Database connection successful")
     else:
@@ -50,6 +71,7 @@ async def lifespan(app: FastAPI):
     
     # Shutdown
     logger.info("👋 Shutting down Story Generator API...")
+    _log_listener.stop()
 
 
 # =================================
@@ -60,6 +82,7 @@ app = FastAPI(
     description="AI-powered personalized fairy tale generator for children",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,  # orjson cho mọi endpoint
     docs_url="/docs" if settings.is_development else None,
     redoc_url="/redoc" if settings.is_development else None,
 )
@@ -69,6 +92,10 @@ app = FastAPI(
 # MIDDLEWARE
 # =================================
 
+# Gzip: scene payload (transcript + URLs) nén được 5-10×,
+# compresslevel=5 cân bằng CPU/ratio cho JSON
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=5)
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -80,30 +107,33 @@ app.add_middleware(
 
 
 # Request logging middleware
+# Hằng số module-level + substring match (path có prefix /api/v1/...)
+_SKIP_PATHS = ("/progress", "/health")
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     """Log all requests with timing."""
-    start_time = time.time()
-    
-    skip_paths = ["/progress", "/health"]
+    path = request.url.path
     should_log = (
-        request.method != "OPTIONS" and
-        not any(path in str(request.url. path) for path in skip_paths)
+        request.method != "OPTIONS"
+        and logger.isEnabledFor(logging.INFO)
+        and not any(p in path for p in _SKIP_PATHS)
     )
-    
-    if should_log:
-        logger.info(f"➡️  {request.method} {request.url.path}")
-    
+
+    # Hot path (polling, health, OPTIONS): không timing, không format gì cả
+    if not should_log:
+        return await call_next(request)
+
+    start_time = time.perf_counter()
+    logger.info("➡️  %s %s", request.method, path)
+
     response = await call_next(request)
-    
-    duration = time.time() - start_time
-    
-    if should_log:
-        logger. info(
-            f"⬅️  {request.method} {request.url.path} - "
-            f"{response.status_code} - {duration:.2f}s"
-        )
-    
+
+    duration = time.perf_counter() - start_time
+    logger.info("⬅️  %s %s - %s - %.2fs",
+                request.method, path, response.status_code, duration)
+
     return response
 
 
@@ -114,8 +144,8 @@ async def log_requests(request: Request, call_next):
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Handle all uncaught exceptions."""
-    logger.error(f"❌ Unhandled exception: {exc}", exc_info=True)
-    return JSONResponse(
+    logger.error("❌ Unhandled exception: %s", exc, exc_info=True)
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
@@ -171,9 +201,13 @@ if __name__ == "__main__":
     import uvicorn
     
     uvicorn.run(
-        "app.main:app",
+        "story_generator.main:app",
         host="0.0.0.0",
         port=8000,
+        # uvloop + httptools (có sẵn trong uvicorn[standard]): event loop
+        # và HTTP parser bằng C, nhanh hơn hẳn cho workload I/O-bound
+        loop="uvloop",
+        http="httptools",
         reload=settings.is_development,
         log_level=settings.log_level.lower()
     )
\ No newline at end of file
@@ -2,16 +2,26 @@
 Pydantic models for Story and Scene data structures.
 """
 
-from pydantic import BaseModel, Field, field_validator, ConfigDict
+from pydantic import BaseModel, Field, field_validator, computed_field, ConfigDict, SkipValidation
 from typing import Optional, List, Literal, Dict
 from datetime import datetime
 from enum import Enum
+from functools import cached_property
+import sys
+
+# Intern các default string dùng lặp lại — 1 object duy nhất được share
+# qua mọi instance (story dài 14 scenes khỏi nhân bản style/voice/status)
+_DEFAULT_IMAGE_STYLE = sys.intern("Pixar style, 3D render, cute, vibrant colors")
+_DEFAULT_VOICE = sys.intern("en-US-News-L")
+_STATUS_GENERATING = sys.intern("generating")
 
 
 def to_camel(string: str) -> str:
-    """Convert snake_case to camelCase"""
-    components = string.split('_')
-    return components[0] + ''.join(x.title() for x in components[1:])
+    """Convert snake_case to camelCase (C-level replace/title, không split+join)."""
+    first, _, rest = string.partition('_')
+    if not rest:
+        return first
+    return first + rest.replace('_', ' ').title().replace(' ', '')
 
 
 class StoryStatus(str, Enum):
@@ -126,13 +136,13 @@ class StoryRequest(BaseModel):
     
     # SỬA: Đổi style mặc định sang 3D/Pixar cho đẹp và hiện đại
     image_style: Optional[str] = Field(
-        default="Pixar style, 3D render, cute, vibrant colors",
+        default=_DEFAULT_IMAGE_STYLE,
         description="Image generation style"
     )
     
     # SỬA: Gợi ý giọng đọc Tiếng Anh (Jenny/Guy)
     voice: Optional[str] = Field(
-        default="en-US-News-L",  
+        default=_DEFAULT_VOICE,
         description="TTS voice selection",
         examples=["en-US-News-L", "en-US-Studio-O", "en-US-Neural2-F"] 
     )
@@ -158,15 +168,14 @@ class Scene(BaseModel):
     # SỬA: Xác định rõ là Text tiếng Anh
     text: str = Field(..., min_length=10, description="Scene narrative text (English)")
     image_prompt: str = Field(..., description="Prompt for image generation")
-    word_count: Optional[int] = Field(default=None, description="Number of words in text")
-    
-    @field_validator('word_count', mode='before')
-    @classmethod
-    def calculate_word_count(cls, v, info):
-        """Auto-calculate word count if not provided."""
-        if v is None and 'text' in info.data:
-            return len(info.data['text'].split())
-        return v
+
+    # computed_field + cached_property: tính 1 lần khi được hỏi,
+    # không chạy validator (+ alloc list token) trên MỌI lần validate
+    @computed_field
+    @cached_property
+    def word_count(self) -> int:
+        """Number of words in text."""
+        return len(self.text.split())
 
 
 class SceneGenerated(BaseModel):
@@ -182,8 +191,9 @@ class SceneGenerated(BaseModel):
     audio_url: str
     audio_duration: Optional[float] = None
 
-    # Transcript segments from STT
-    transcript:  Optional[List[Dict]] = Field(
+    # Transcript segments from STT — data nội bộ (Whisper → DB), skip
+    # per-element dict validation vì mỗi scene có thể có hàng chục segments
+    transcript:  Optional[SkipValidation[List[dict]]] = Field(
         default=None,
         description="Transcript segments with timing from Speech-to-Text"
     )
@@ -192,6 +202,21 @@ class SceneGenerated(BaseModel):
     narration_voice: Optional[str] = None
     word_count: Optional[int] = None
 
+    @classmethod
+    def from_trusted(cls, data: Dict):
+        """
+        Build từ data ĐÃ validate (DB row của mình) — skip validation.
+
+        model_construct bỏ qua key không phải field, nên truyền thẳng
+        full DB row được. Subclass (SceneWithStatus) dùng chung.
+        """
+        # DB không lưu word_count → tính từ paragraph_text như baseline
+        if data.get("word_count") is None:
+            text = data.get("paragraph_text")
+            if text:
+                data = {**data, "word_count": len(text.split())}
+        return cls.model_construct(**data)
+
 
 # =================================
 # RESPONSE MODELS
@@ -217,6 +242,19 @@ class StoryResponse(BaseModel):
     # Scenes (populated when fetching full story)
     scenes: List[SceneGenerated] = Field(default_factory=list)
 
+    @classmethod
+    def from_trusted(cls, data: Dict):
+        """
+        Build từ DB data đã validate — model_construct KHÔNG recurse,
+        nên scenes phải construct từng item trước.
+        """
+        data = dict(data)
+        data["scenes"] = [
+            s if isinstance(s, SceneGenerated) else SceneGenerated.from_trusted(s)
+            for s in data.get("scenes") or []
+        ]
+        return cls.model_construct(**data)
+
 
 class StoryListItem(BaseModel):
     """Simplified story item for list view."""
@@ -380,12 +418,35 @@ class StoryProgressResponse(BaseModel):
         default=None,
         description="Thời gian còn lại ước tính (seconds)"
     )
-    
+
     error_message: Optional[str] = Field(
         default=None,
         description="Thông báo lỗi nếu story failed"
     )
 
+    delta_only: bool = Field(
+        default=False,
+        description="True nếu scenes chỉ là delta (poll với ?since= > 0)"
+    )
+
+    last_seen_order: int = Field(
+        default=0,
+        description="scene_order cao nhất đã trả — client gửi lại làm ?since= cho lần poll sau"
+    )
+
+    @classmethod
+    def from_trusted(cls, data: Dict):
+        """Build từ data đã validate — construct nested progress/scenes tay."""
+        data = dict(data)
+        progress = data.get("progress")
+        if isinstance(progress, dict):
+            data["progress"] = ProgressInfo.model_construct(**progress)
+        data["scenes"] = [
+            s if isinstance(s, SceneWithStatus) else SceneWithStatus.from_trusted(s)
+            for s in data.get("scenes") or []
+        ]
+        return cls.model_construct(**data)
+
 
 class StoryGenerationStartResponse(BaseModel):
     """
@@ -436,7 +497,7 @@ class StoryGenerationStartResponse(BaseModel):
     )
     
     status: str = Field(
-        default="generating",
+        default=_STATUS_GENERATING,
         description="Luôn là 'generating' khi mới bắt đầu"
     )
     
@@ -1,5 +1,5 @@
 """Story generation prompts."""
 
-from story_generator.prompts.story_prompts import SYSTEM_PROMPT, create_user_prompt, validate_story_response
+from story_generator.prompts.story_prompts import SYSTEM_PROMPT_STATIC, create_user_prompt, validate_story_response
 
-__all__ = ["SYSTEM_PROMPT", "create_user_prompt", "validate_story_response"]
\ No newline at end of file
+__all__ = ["SYSTEM_PROMPT_STATIC", "create_user_prompt", "validate_story_response"]
\ No newline at end of file
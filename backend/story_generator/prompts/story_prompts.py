@@ -3,11 +3,15 @@ Story generation prompts - Enhanced với title uniqueness và mythology integra
 Target: <900 tokens, chính xác words/scene, NO duplicate titles
 """
 
-from typing import Optional, Dict
+from typing import Optional, Dict, NamedTuple
+from functools import lru_cache
+import itertools
 import logging
 import random
-import hashlib
-from datetime import datetime
+import re
+import secrets
+import sys
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -37,7 +41,7 @@ STORY_CONFIG = {
 }
 
 # =================================
-# TITLE STYLE VARIATIONS (để tránh trùng lặp)
+# TITLE STYLE VARIATIONS (fallback — diversity chính giờ nằm ở sampling layer)
 # =================================
 
 TITLE_STYLES = [
@@ -48,102 +52,137 @@ TITLE_STYLES = [
     "poetic",       # "Where Starlight Meets the Sea"
 ]
 
+# Round-robin qua bản shuffle thay vì random.choice mỗi call —
+# next(cycle) lock-free, vẫn đủ "ngẫu nhiên" cho mục đích đa dạng title
+_tls = threading.local()
+
+
+def _next_cycle(name: str, seq: list) -> str:
+    cycle = getattr(_tls, name, None)
+    if cycle is None:
+        cycle = itertools.cycle(_RNG.sample(seq, len(seq)))
+        setattr(_tls, name, cycle)
+    return next(cycle)
+
 # =================================
 # MYTHOLOGY REGION KEYWORDS (tích hợp với character naming)
 # =================================
 
+# Tuples: immutable, header nhỏ hơn list — chỉ đọc, không bao giờ mutate
 MYTHOLOGY_HINTS = {
-    "norse": ["viking warriors", "ancient runes", "frozen fjords", "northern lights"],
-    "japanese": ["cherry blossoms", "sacred temples", "samurai honor", "zen gardens"],
-    "greek": ["marble columns", "ancient olympus", "mediterranean shores", "mythic heroes"],
-    "celtic": ["mystical druids", "emerald hills", "ancient forests", "fairy circles"],
-    "egyptian": ["golden pyramids", "desert sands", "pharaoh's treasures", "nile rivers"],
-    "fantasy": ["enchanted forests", "crystal caves", "magic spells", "floating islands"]
+    "norse": ("viking warriors", "ancient runes", "frozen fjords", "northern lights"),
+    "japanese": ("cherry blossoms", "sacred temples", "samurai honor", "zen gardens"),
+    "greek": ("marble columns", "ancient olympus", "mediterranean shores", "mythic heroes"),
+    "celtic": ("mystical druids", "emerald hills", "ancient forests", "fairy circles"),
+    "egyptian": ("golden pyramids", "desert sands", "pharaoh's treasures", "nile rivers"),
+    "fantasy": ("enchanted forests", "crystal caves", "magic spells", "floating islands")
 }
 
+# RNG instance riêng cho module — khỏi đụng global Random của stdlib
+_RNG = random.Random()
 
-def get_scene_config(story_length: str) -> Dict:
-    """Lấy cấu hình CHÍNH XÁC theo bảng."""
-    config = STORY_CONFIG.get(story_length, STORY_CONFIG["short"])
-    
+
+class SceneConfig(NamedTuple):
+    """Config phẳng tính sẵn từ STORY_CONFIG — attribute access nhanh hơn dict lookup."""
+    num_scenes: int
+    words_per_scene_min: int
+    words_per_scene_max: int
+    target_words: int
+    sentences_per_scene: tuple
+
+
+def _build_scene_config(length: str) -> SceneConfig:
+    config = STORY_CONFIG[length]
     num_scenes = config["num_scenes"]
     words_min, words_max = config["words_per_scene"]
-    avg_words_per_scene = (words_min + words_max) / 2
-    target_words = int(num_scenes * avg_words_per_scene)
-    
-    return {
-        "num_scenes": num_scenes,
-        "words_per_scene_min": words_min,
-        "words_per_scene_max": words_max,
-        "target_words": target_words,
-        "sentences_per_scene": config["sentences_per_scene"]
-    }
+    return SceneConfig(
+        num_scenes=num_scenes,
+        words_per_scene_min=words_min,
+        words_per_scene_max=words_max,
+        target_words=int(num_scenes * (words_min + words_max) / 2),
+        sentences_per_scene=config["sentences_per_scene"],
+    )
+
+
+# Precompute 1 lần lúc import — get_scene_config chỉ còn 1 dict.get
+_SCENE_CONFIG_CACHE = {k: _build_scene_config(k) for k in STORY_CONFIG}
+
+
+def get_scene_config(story_length: str) -> SceneConfig:
+    """Lấy cấu hình CHÍNH XÁC theo bảng."""
+    return _SCENE_CONFIG_CACHE.get(story_length, _SCENE_CONFIG_CACHE["short"])
 
 
 def get_scene_count(story_length: str) -> int:
     """Get fixed scene count."""
-    return STORY_CONFIG.get(story_length, STORY_CONFIG["short"])["num_scenes"]
+    return _SCENE_CONFIG_CACHE.get(story_length, _SCENE_CONFIG_CACHE["short"]).num_scenes
+
+
+# Keyword sets compile sẵn cho detect_mythology_region — thứ tự ưu tiên giữ nguyên
+# (intern để membership test hit identity-compare fast path)
+_REGION_KEYWORDS = tuple(
+    (region, frozenset(map(sys.intern, keywords)))
+    for region, keywords in (
+        ("norse", ("viking", "norse", "rune", "fjord", "ice", "snow")),
+        ("japanese", ("samurai", "cherry", "temple", "zen", "kimono", "japan")),
+        ("greek", ("olympus", "toga", "marble", "greek", "sparta", "hero")),
+        ("celtic", ("druid", "clover", "mist", "celtic", "ireland", "fairy")),
+        ("egyptian", ("pyramid", "desert", "sphinx", "pharaoh", "egypt", "nile")),
+    )
+)
+
+_WORD_RE = re.compile(r"[a-z]+")
 
 
+@lru_cache(maxsize=1024)
 def detect_mythology_region(user_input: str, theme: Optional[str] = None) -> str:
     """
     Phát hiện mythology region từ user input để inject hints.
     Tương đồng với CharacterNameExtractor.detect_mythology_region()
+
+    Tokenize 1 lần rồi intersect với keyword set — O(tokens) hash lookup
+    thay vì substring scan từng keyword (cũng hết bug "hero" match
+    trong "superhero").
     """
-    combined_text = f"{user_input} {theme or ''}".lower()
-    
-    if any(word in combined_text for word in ["viking", "norse", "rune", "fjord", "ice", "snow"]):
-        return "norse"
-    elif any(word in combined_text for word in ["samurai", "cherry", "temple", "zen", "kimono", "japan"]):
-        return "japanese"
-    elif any(word in combined_text for word in ["olympus", "toga", "marble", "greek", "sparta", "hero"]):
-        return "greek"
-    elif any(word in combined_text for word in ["druid", "clover", "mist", "celtic", "ireland", "fairy"]):
-        return "celtic"
-    elif any(word in combined_text for word in ["pyramid", "desert", "sphinx", "pharaoh", "egypt", "nile"]):
-        return "egyptian"
-    
+    tokens = frozenset(_WORD_RE.findall(f"{user_input} {theme or ''}".lower()))
+
+    for region, keywords in _REGION_KEYWORDS:
+        if tokens & keywords:
+            return region
+
     return "fantasy"
 
 
 def generate_uniqueness_seed() -> str:
     """
-    Tạo TRULY UNIQUE seed với UUID + timestamp microsecond. 
+    Tạo seed 10 hex chars — token_hex lấy entropy từ OS trong 1 C call,
+    khỏi UUID + timestamp + MD5 vòng vèo cho cùng kết quả.
     """
-    import uuid
-    import random as rand
-    
-    # Combine UUID + timestamp + random
-    unique_id = str(uuid.uuid4())[:8]
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S%f")  
-    random_num = str(rand.randint(10000, 99999))
-    
-    combined = f"{unique_id}-{timestamp}-{random_num}"
-    hash_obj = hashlib.md5(combined.encode())
-    
-    return hash_obj.hexdigest()[:10]
+    return secrets.token_hex(5)
 
 
 # =================================
 # ENHANCED SYSTEM PROMPT
 # =================================
 
-SYSTEM_PROMPT = """Fairy tale writer for kids 2-12. Create UNIQUE magical stories.
+# Phần STATIC (~90% tokens, 0 placeholder) đứng TRƯỚC: mọi request share
+# cùng 1 prefix byte-identical → provider prompt-cache hit, TTFT thấp hơn
+SYSTEM_PROMPT_STATIC = """Fairy tale writer for kids 2-12. Create UNIQUE magical stories.
 
 JSON:
-{{
-  "title": "Magical title ({title_style}{mythology_hint})",
+{
+  "title": "Magical title",
   "character_design": "EXACT DETAILS:  [age]yo [gender], [skin color], [hair:  exact style+color], [outfit: item1 color1, item2 color2, item3 color3], [eyes: color+shape], [face: features], [build: body type]",
   "background_design":  "[place type], [magic element 1], [magic element 2], [lighting], [color palette]",
-  "scenes": [{{"scene_number": 1, "text": "{words_min}-{words_max}w", "image_prompt": "{{{{CHAR}}}} [action], {{{{BG}}}} [location]"}}]
-}}
+  "scenes": [{"scene_number": 1, "text": "scene text", "image_prompt": "{{CHAR}} [action], {{BG}} [location]"}]
+}
 
 CHARACTER (CRITICAL - MUST BE IDENTICAL IN ALL SCENES):
 - Dragon→[COLOR]scales+[COLOR]wings+[SIZE]claws+[COLOR]eyes+[SIZE]body | Robot→[SHAPE]head+[COLOR]metal+[COLOR]lights+[SHAPE]antenna+[SIZE]
 - MUST: SIZE(tiny/small/med/large), EXACT COLOR(emerald/ruby/silver/cyan), EXACT SHAPE(round/square/oval)
 - Example: "small robot, round silver head, cyan glowing eyes, thin square antenna, orange chest panel"
 
-TITLE (MUST be magical/whimsical, seed={seed} for uniqueness):
+TITLE (MUST be magical/whimsical):
 - AVOID boring: "Blinky's Skyward Leap","Zeep's Floating Lesson" ❌
 - AVOID patterns: "Princess [Name] and the Crystal...","[Name] and the Staircase..." ❌
 - AVOID: "Whispering","Emerald","Gentle Giant","Golden","Glowing","Crystal Staircase","Crystal Bridge"
@@ -163,7 +202,12 @@ DESIGN (for 100% consistency):
 - Dragon: [color]scales(emerald/ruby/gold),[color]wings,[size]claws(small/large),[color]eyes,[SIZE]overall(tiny/small/med/large)
 - Human: [skin],[hair:style+color],[3+outfit:item+color]
 - EVERY feature needs: COLOR + SHAPE + SIZE
+"""
 
+# Tail NGẮN chỉ chứa scene counts — diversity (title style, seed) đã chuyển
+# sang sampling layer (temperature=0.99 + seed xoay per-request ở caller),
+# nên prompt giờ identical per length → provider cache hit tối đa
+SYSTEM_PROMPT_TAIL = """
 RULES:
 - {num_scenes} scenes, {words_min}-{words_max}w each
 - Numbers as words, happy end, safe
@@ -171,6 +215,22 @@ RULES:
 JSON only."""
 
 
+@lru_cache(maxsize=8)
+def _build_prompt_tail(story_length: str) -> str:
+    config = get_scene_config(story_length)
+    return SYSTEM_PROMPT_TAIL.format(
+        num_scenes=config.num_scenes,
+        words_min=config.words_per_scene_min,
+        words_max=config.words_per_scene_max,
+    )
+
+
+# Prewarm 3 lengths lúc import — request đầu tiên cũng không phải parse template
+for _length in STORY_CONFIG:
+    _build_prompt_tail(_length)
+del _length
+
+
 # =================================
 # ENHANCED USER PROMPT
 # =================================
@@ -182,6 +242,16 @@ OPENERS = [
     "{tone} journey:",
 ]
 
+# Tone là closed set (StoryTone enum) → format sẵn mọi opener lúc import,
+# hot path chỉ còn dict lookup, khỏi capitalize() + parse format string
+_KNOWN_TONES = ("gentle", "funny", "adventurous")
+_OPENER_IDX = list(range(len(OPENERS)))
+_OPENERS_FMT = {
+    (t, i): tmpl.format(tone=t.capitalize())
+    for t in _KNOWN_TONES
+    for i, tmpl in enumerate(OPENERS)
+}
+
 
 def create_user_prompt(
     user_input: str,
@@ -198,13 +268,16 @@ def create_user_prompt(
     Just add scene requirements.
     """
     config = get_scene_config(story_length)
-    
-    # ✅ SIMPLE FORMAT: Just the story idea + scene requirements
+
+    # ✅ SIMPLE FORMAT: opener (đã format sẵn, xoay vòng) + story idea + scene requirements
+    idx = _next_cycle("opener_idx", _OPENER_IDX)
+    opener = _OPENERS_FMT.get((story_tone, idx)) or OPENERS[idx].format(tone=story_tone.capitalize())
+
     prompt = (
-        f"{story_tone.capitalize()} story: {user_input}\n"
-        f"{config['num_scenes']} scenes, {config['words_per_scene_min']}-{config['words_per_scene_max']}w/scene, JSON only"
+        f"{opener} {user_input}\n"
+        f"{config.num_scenes} scenes, {config.words_per_scene_min}-{config.words_per_scene_max}w/scene, JSON only"
     )
-    
+
     return prompt
 
 
@@ -214,82 +287,102 @@ def create_system_prompt(
     theme: Optional[str] = None
 ) -> str:
     """
-    Generate system prompt with uniqueness seed.
-    
+    Generate system prompt (static prefix + scene-count tail).
+
+    Title/story diversity đến từ sampling layer (temperature + seed
+    per-request ở StoryGeneratorService) — prompt identical per length.
+
     Args:
         story_length: "short" | "medium" | "long"
         user_input: Not used (kept for compatibility)
         theme: Not used (kept for compatibility)
-    
+
     Returns:
         Optimized system prompt (~600 tokens)
     """
-    config = get_scene_config(story_length)
-    seed = generate_uniqueness_seed()
-    
-    return SYSTEM_PROMPT.format(
-        num_scenes=config["num_scenes"],
-        words_min=config["words_per_scene_min"],
-        words_max=config["words_per_scene_max"],
-        sentences=f"{config['sentences_per_scene'][0]}-{config['sentences_per_scene'][1]}",
-        title_style=random.choice(TITLE_STYLES),
-        mythology_hint="",  # Removed for simplicity
-        seed=seed
-    )
+    return SYSTEM_PROMPT_STATIC + _build_prompt_tail(story_length)
 
 
 # =================================
 # VALIDATION
 # =================================
 
-def validate_story_response(response: dict) -> tuple[bool, str]:
+# Keys/pattern compile sẵn: superset check là 1 C call, regex IGNORECASE
+# khỏi phải .lower() copy cả string character_design
+_REQUIRED_KEYS = frozenset(
+    map(sys.intern, ("title", "character_design", "background_design", "scenes"))
+)
+_REQUIRED_SCENE_KEYS = frozenset(map(sys.intern, ("scene_number", "text", "image_prompt")))
+_NON_HUMAN_RE = re.compile(r"robot|dragon|unicorn|alien|monster|creature|animal", re.IGNORECASE)
+_HAIR_RE = re.compile(r"hair", re.IGNORECASE)
+_EYES_RE = re.compile(r"eyes", re.IGNORECASE)
+
+
+def validate_story_response(
+    response: dict,
+    # Loop-invariants bind làm default arg → LOAD_FAST thay vì LOAD_GLOBAL
+    _required=_REQUIRED_KEYS,
+    _scene_keys=_REQUIRED_SCENE_KEYS,
+    _non_human_search=_NON_HUMAN_RE.search,
+    _hair_search=_HAIR_RE.search,
+    _eyes_search=_EYES_RE.search,
+    _len=len,
+) -> tuple[bool, str]:
     """Fast validation."""
-    
-    required = ["title", "character_design", "background_design", "scenes"]
-    for field in required:
-        if field not in response or not response[field]:
-            return False, f"Missing {field}"
-    
+
+    if not _required <= response.keys() or not all(response[k] for k in _required):
+        for field in ("title", "character_design", "background_design", "scenes"):
+            if field not in response or not response[field]:
+                return False, f"Missing {field}"
+
+    # Malformed payload fail sớm, trước khi đụng vào scene items
+    scenes = response["scenes"]
+    if not isinstance(scenes, list) or _len(scenes) == 0:
+        return False, "Invalid scenes"
+
     # Check character_design có đủ keywords (chỉ check hair cho humans)
-    char = response["character_design"].lower()
-    
-    # Detect character type
-    non_human_types = ["robot", "dragon", "unicorn", "alien", "monster", "creature", "animal"]
-    is_non_human = any(t in char for t in non_human_types)
-    
-    # Only require hair for humans
-    if is_non_human:
-        required_keywords = ["eyes"]  
-    else:
-        required_keywords = ["hair", "eyes"]
-    
-    missing = [k for k in required_keywords if k not in char]
-    
+    char = response["character_design"]
+    missing = []
+    if not _non_human_search(char) and not _hair_search(char):
+        missing.append("hair")
+    if not _eyes_search(char):
+        missing.append("eyes")
+
     if missing:
-        logger.warning(f"⚠️ character_design missing: {missing}")
-    
+        logger.warning("⚠️ character_design missing: %s", missing)
+
     # Validate title không quá ngắn
-    if len(response["title"]) < 5:
+    if _len(response["title"]) < 5:
         return False, "Title too short"
-    
-    scenes = response["scenes"]
-    if not isinstance(scenes, list) or len(scenes) == 0:
-        return False, "Invalid scenes"
-    
+
     for i, scene in enumerate(scenes, 1):
-        if "scene_number" not in scene:
+        # Fast path: superset check 1 lần per scene thay vì 3 probe riêng
+        if scene.keys() >= _scene_keys:
+            text = scene["text"]
+            if text is None or _len(text) < 15:
+                return False, f"Scene {i}: text too short"
+            continue
+
+        # Slow path (scene thiếu key): xác định key nào để báo lỗi
+        get = scene.get
+        if get("scene_number") is None:
             return False, f"Scene {i}: missing scene_number"
-        if "text" not in scene or len(scene["text"]) < 15:
+        text = get("text")
+        if text is None or len(text) < 15:
             return False, f"Scene {i}: text too short"
-        if "image_prompt" not in scene:
-            return False, f"Scene {i}: missing image_prompt"
-    
+        return False, f"Scene {i}: missing image_prompt"
+
     return True, "Valid"
 
 # =================================
 # MOBILE PARAMS BUILDER (NEW)
 # =================================
 
+# Hằng số hoisted khỏi hot path — khỏi dựng lại list/tuple mỗi request
+_VOWELS = frozenset("aeiouAEIOU")
+_LESSON_PREFIXES = ("always ", "be ", "never ", "tell ", "listen ", "share ", "believe ")
+
+
 def build_prompt_from_mobile_params(
     character: str,
     place: str,
@@ -322,7 +415,7 @@ def build_prompt_from_mobile_params(
         valid_child_name = child_name.strip()
     
     # ✅ Build character part (simple, no mapping needed)
-    article = "An" if character[0].lower() in ['a', 'e', 'i', 'o', 'u'] else "A"
+    article = "An" if character[:1] in _VOWELS else "A"
     
     if valid_child_name:
         char_part = f"{article} {character} named {valid_child_name}"
@@ -330,8 +423,8 @@ def build_prompt_from_mobile_params(
         char_part = f"{article} {character}"
     
     # ✅ Clean lesson format
-    if lesson.startswith(("always ", "be ", "never ", "tell ", "listen ", "share ", "believe ")):
-        lesson = "to " + lesson.replace("always ", "", 1)
+    if lesson.startswith(_LESSON_PREFIXES):
+        lesson = "to " + lesson.removeprefix("always ")
     
     # ✅ Build CONCISE prompt (NO repetition)
     prompt = f"{char_part} {place} who {adventure} and learns {lesson}."
@@ -64,13 +64,40 @@ class CharacterNameExtractor:
         "royal": ["ton", "wick", "ford", "ridge", "mont", "castle", "crown", "heir"]
     }
     
+    # Alternation compile sẵn per category — mỗi detect_* còn 1 regex pass
+    # thay vì ~20 substring scan. \b đầu từ tránh false match kiểu "he"
+    # trong "the" hay "male" trong "female"; không đóng \b cuối để vẫn
+    # match stem ("enchant" → "enchanted"). IGNORECASE thay cho .lower().
+    _REGION_RE = re.compile(
+        r"\b(?:(?P<norse>viking|norse|rune|fjord|ice|snow|nordic)"
+        r"|(?P<japanese>samurai|cherry|temple|zen|kimono|pagoda|manga|anime)"
+        r"|(?P<greek>olympus|toga|marble|mediterranean|greek|sparta)"
+        r"|(?P<celtic>druid|clover|mist|highland|celtic|ireland|fairy)"
+        r"|(?P<egyptian>pyramid|desert|sphinx|pharaoh|egypt|nile))",
+        re.IGNORECASE,
+    )
+
+    _GENDER_RE = re.compile(
+        r"\b(?:(?P<female>female|girl|princess|she|her|woman)"
+        r"|(?P<male>male|boy|prince|he|him|man))",
+        re.IGNORECASE,
+    )
+
+    _THEME_RE = re.compile(
+        r"\b(?:(?P<ocean>ocean|sea|water|mermaid|wave|coral)"
+        r"|(?P<fire>fire|flame|dragon|lava|phoenix|burn)"
+        r"|(?P<magic>magic|wizard|spell|fairy|enchant|mystic)"
+        r"|(?P<royal>king|queen|prince|princess|royal|castle|crown))",
+        re.IGNORECASE,
+    )
+
     def __init__(self, db: Database):
         self.db = db
-    
+
     def detect_mythology_region(self, character_design: str, background_design: str = "") -> str:
         """
         Phát hiện vùng mythology dựa trên character design và background.
-        
+
         Keywords mapping:
         - Norse: viking, norse, runes, fjord, ice
         - Japanese: samurai, cherry blossom, temple, zen, kimono
@@ -78,57 +105,24 @@ class CharacterNameExtractor:
         - Celtic: druid, clover, mist, highland
         - Egyptian: pyramid, desert, sphinx, pharaoh
         """
-        combined_text = f"{character_design} {background_design}".lower()
-        
-        # Norse/Viking
-        if any(word in combined_text for word in ["viking", "norse", "rune", "fjord", "ice", "snow", "nordic"]):
-            return "norse"
-        
-        # Japanese
-        if any(word in combined_text for word in ["samurai", "cherry", "temple", "zen", "kimono", "pagoda", "manga", "anime"]):
-            return "japanese"
-        
-        # Greek
-        if any(word in combined_text for word in ["olympus", "toga", "marble", "mediterranean", "greek", "sparta"]):
-            return "greek"
-        
-        # Celtic
-        if any(word in combined_text for word in ["druid", "clover", "mist", "highland", "celtic", "ireland", "fairy"]):
-            return "celtic"
-        
-        # Egyptian
-        if any(word in combined_text for word in ["pyramid", "desert", "sphinx", "pharaoh", "egypt", "nile"]):
-            return "egyptian"
-        
+        m = self._REGION_RE.search(f"{character_design} {background_design}")
+
         # Default to fantasy
-        return "fantasy"
-    
+        return m.lastgroup if m else "fantasy"
+
     def detect_gender(self, character_design: str) -> str:
         """Phát hiện giới tính từ character design."""
-        design_lower = character_design.lower()
-        
-        if any(word in design_lower for word in ["female", "girl", "princess", "she", "her", "woman"]):
-            return "female"
-        elif any(word in design_lower for word in ["male", "boy", "prince", "he", "him", "man"]):
-            return "male"
-        
+        m = self._GENDER_RE.search(character_design)
+        if m:
+            return m.lastgroup
+
         # Random nếu không xác định được
         return random.choice(["male", "female"])
-    
+
     def detect_theme(self, character_design: str, background_design: str = "") -> str:
         """Phát hiện theme để chọn syllables phù hợp."""
-        combined_text = f"{character_design} {background_design}".lower()
-        
-        if any(word in combined_text for word in ["ocean", "sea", "water", "mermaid", "wave", "coral"]):
-            return "ocean"
-        elif any(word in combined_text for word in ["fire", "flame", "dragon", "lava", "phoenix", "burn"]):
-            return "fire"
-        elif any(word in combined_text for word in ["magic", "wizard", "spell", "fairy", "enchant", "mystic"]):
-            return "magic"
-        elif any(word in combined_text for word in ["king", "queen", "prince", "princess", "royal", "castle", "crown"]):
-            return "royal"
-        else:
-            return "nature"  # Default
+        m = self._THEME_RE.search(f"{character_design} {background_design}")
+        return m.lastgroup if m else "nature"  # Default
     
     def generate_two_syllable_name(self, theme: str, gender: str) -> str:
         """
@@ -213,11 +207,12 @@ class CharacterNameExtractor:
             return True, None
         
         try:
-            response = self.db.client.table("stories")\
-                .select("character_name")\
-                .eq("user_id", user_id)\
-                .eq("character_name", name)\
-                .execute()
+            response = await self.db._execute(
+                self.db.client.table("stories")
+                .select("character_name")
+                .eq("user_id", user_id)
+                .eq("character_name", name)
+            )
             
             if response.data and len(response.data) > 0:
                 # Tên đã tồn tại → gợi ý tên mới với suffix số
@@ -11,6 +11,7 @@ import logging
 import asyncio
 import io
 import os
+from functools import lru_cache
 from typing import Optional
 from PIL import Image, ImageDraw, ImageFont
 
@@ -48,7 +49,7 @@ class ImageGenerator:
         try:
             # Check credentials path
             if not os.path.exists(self.credentials_path):
-                parent_path = os.path.join(". .", self.credentials_path)
+                parent_path = os.path.join("..", self.credentials_path)
                 if os.path.exists(parent_path):
                     self.credentials_path = parent_path
                 else:
@@ -79,6 +80,75 @@ class ImageGenerator:
         except Exception as e: 
             logger.error(f"❌ Init failed: {e}", exc_info=True)
     
+    async def warmup(self):
+        """Đảm bảo Vertex model đã sẵn sàng (best-effort, không tốn quota generate)."""
+        try:
+            if self.model is None:
+                await asyncio.to_thread(self._init_vertex_ai)
+            logger.info("🔥 Image Generator warmed up")
+        except Exception as e:
+            logger.warning(f"⚠️ Image Generator warmup failed (non-fatal): {e}")
+
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def _build_char_consistency(character_design: str) -> str:
+        """
+        Build consistency-enforcement block từ character_design.
+
+        Tách riêng + lru_cache: mọi scene của một story share đúng một
+        design string nên block này giống hệt nhau giữa các scene.
+        """
+        # Extract key features to enforce
+        char_lower = character_design.lower()
+
+        # Build consistency enforcement
+        consistency_details = []
+
+        # Add character design verbatim
+        consistency_details.append(f"Character MUST BE EXACTLY: {character_design}")
+
+        # ✅ Extract and enforce specific colors
+        color_keywords = ["red", "blue", "green", "yellow", "orange", "purple", "pink", "black", "white",
+                        "gray", "grey", "brown", "silver", "gold", "emerald", "cyan", "teal", "ruby",
+                        "sapphire", "amber", "crimson", "violet", "turquoise"]
+        found_colors = [color for color in color_keywords if color in char_lower]
+        if found_colors:
+            consistency_details.append(f"EXACT COLORS: {', '.join(found_colors)} - NEVER change these colors in ANY scene")
+
+        # ✅ Extract and enforce specific shapes
+        shape_keywords = ["round", "square", "cylindrical", "oval", "rectangular", "triangular",
+                        "spherical", "cubic", "flat", "curved", "pointed", "angular"]
+        found_shapes = [shape for shape in shape_keywords if shape in char_lower]
+        if found_shapes:
+            consistency_details.append(f"EXACT SHAPES: {', '.join(found_shapes)} - NEVER change these shapes in ANY scene")
+
+        # ✅ Extract and enforce sizes
+        size_keywords = ["tiny", "small", "medium", "large", "huge", "big", "little", "short", "tall", "long"]
+        found_sizes = [size for size in size_keywords if size in char_lower]
+        if found_sizes:
+            consistency_details.append(f"EXACT SIZES: {', '.join(found_sizes)} - NEVER change these sizes in ANY scene")
+
+        # Add explicit "SAME" enforcement with measurements
+        consistency_details.append("CRITICAL: This is the EXACT SAME character from scene 1")
+        consistency_details.append("MAINTAIN 100% IDENTICAL in ALL scenes: face shape, body proportions, ALL colors, ALL shapes, ALL sizes, clothing, accessories, hairstyle")
+
+        # ✅ Enhanced negative prompts with specifics
+        negative_prompts = [
+            "NEVER change: face shape",
+            "NEVER change: body size or proportions",
+            "NEVER change: ANY colors",
+            "NEVER change: ANY shapes",
+            "NEVER change: outfit or clothing",
+            "NEVER change: hair style or color",
+            "NEVER change: species or character type"
+        ]
+        consistency_details.append(" | ".join(negative_prompts))
+
+        # ✅ Add reference instruction with emphasis
+        consistency_details.append("Scene 2-6: Character MUST be PIXEL-PERFECT identical to scene 1. Same face, same body, same colors, same everything")
+
+        return ". ".join(consistency_details)
+
     async def generate_image(
         self,
         prompt: str,
@@ -120,59 +190,9 @@ class ImageGenerator:
         action = action.replace(", at ", " ").replace(", in ", " ").strip()
         
         # ✅ NEW: Build DETAILED character prompt with EXACT features
-        if character_design:
-            # Extract key features to enforce
-            char_lower = character_design.lower()
-            
-            # Build consistency enforcement
-            consistency_details = []
-            
-            # Add character design verbatim
-            consistency_details.append(f"Character MUST BE EXACTLY: {character_design}")
-            
-            # ✅ Extract and enforce specific colors
-            color_keywords = ["red", "blue", "green", "yellow", "orange", "purple", "pink", "black", "white", 
-                            "gray", "grey", "brown", "silver", "gold", "emerald", "cyan", "teal", "ruby", 
-                            "sapphire", "amber", "crimson", "violet", "turquoise"]
-            found_colors = [color for color in color_keywords if color in char_lower]
-            if found_colors:
-                consistency_details.append(f"EXACT COLORS: {', '.join(found_colors)} - NEVER change these colors in ANY scene")
-            
-            # ✅ Extract and enforce specific shapes
-            shape_keywords = ["round", "square", "cylindrical", "oval", "rectangular", "triangular", 
-                            "spherical", "cubic", "flat", "curved", "pointed", "angular"]
-            found_shapes = [shape for shape in shape_keywords if shape in char_lower]
-            if found_shapes:
-                consistency_details.append(f"EXACT SHAPES: {', '.join(found_shapes)} - NEVER change these shapes in ANY scene")
-            
-            # ✅ Extract and enforce sizes
-            size_keywords = ["tiny", "small", "medium", "large", "huge", "big", "little", "short", "tall", "long"]
-            found_sizes = [size for size in size_keywords if size in char_lower]
-            if found_sizes:
-                consistency_details.append(f"EXACT SIZES: {', '.join(found_sizes)} - NEVER change these sizes in ANY scene")
-            
-            # Add explicit "SAME" enforcement with measurements
-            consistency_details.append("CRITICAL: This is the EXACT SAME character from scene 1")
-            consistency_details.append("MAINTAIN 100% IDENTICAL in ALL scenes: face shape, body proportions, ALL colors, ALL shapes, ALL sizes, clothing, accessories, hairstyle")
-            
-            # ✅ Enhanced negative prompts with specifics
-            negative_prompts = [
-                "NEVER change: face shape",
-                "NEVER change: body size or proportions",
-                "NEVER change: ANY colors",
-                "NEVER change: ANY shapes",
-                "NEVER change: outfit or clothing",
-                "NEVER change: hair style or color",
-                "NEVER change: species or character type"
-            ]
-            consistency_details.append(" | ".join(negative_prompts))
-            
-            # ✅ Add reference instruction with emphasis
-            consistency_details.append("Scene 2-6: Character MUST be PIXEL-PERFECT identical to scene 1. Same face, same body, same colors, same everything")
-            
-            char_consistency = ". ".join(consistency_details)
-        else:
-            char_consistency = ""
+        # Cached theo character_design: cả story dùng CHUNG 1 design
+        # → chỉ scan keywords + build block 1 lần, các scene sau lấy lại
+        char_consistency = self._build_char_consistency(character_design) if character_design else ""
         
         # Rebuild với thứ tự CỐ ĐỊNH: CHARACTER → ACTION → BACKGROUND
         if character_design and background_design:
@@ -268,7 +288,9 @@ class ImageGenerator:
                 
                 # Validate image
                 if image_bytes and len(image_bytes) > 100:
-                    compressed_bytes = self._compress_image(image_bytes)
+                    # Nén WebP là CPU-bound (PIL) → đẩy sang thread,
+                    # không block event loop khi nhiều scene nén cùng lúc
+                    compressed_bytes = await asyncio.to_thread(self._compress_image, image_bytes)
                     if character_seed:
                         logger.info(f"✅ Scene {scene_number}: Generated with seed={character_seed}")
                     else:
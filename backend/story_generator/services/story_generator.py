@@ -10,10 +10,14 @@ Features:
 - Detailed logging
 """
 
+import copy
+import hashlib
 import logging
 import json
+import time
 from typing import Optional
 import asyncio
+import httpx
 from openai import OpenAI
 
 from story_generator.config import settings
@@ -43,14 +47,48 @@ class StoryGenerator:
 
     def __init__(self):
         """Initialize OpenRouter client with request counter."""
+        # Pooled httpx client với keep-alive: retry / request liên tiếp
+        # dùng lại TLS connection thay vì handshake mới mỗi lần
+        self.http_client = httpx.Client(
+            timeout=httpx.Timeout(60.0, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=50,
+                max_keepalive_connections=20
+            )
+        )
         self.client = OpenAI(
             api_key=settings.openrouter_api_key,
-            base_url="https://openrouter.ai/api/v1"
+            base_url="https://openrouter.ai/api/v1",
+            http_client=self.http_client
         )
         self.model = settings.openrouter_model
         self.request_count = 0
-        
+
+        # In-process TTL cache: key = sha256(request tuple) → (deadline, story_data)
+        # Chỉ hoạt động khi enable_story_cache=True (demo/testing)
+        self._cache: dict[str, tuple[float, dict]] = {}
+
         logger.info(f"✅ Story Generator initialized (Model: {self.model})")
+
+    async def warmup(self):
+        """Mở sẵn TLS connection tới OpenRouter (best-effort, chạy lúc startup)."""
+        try:
+            await asyncio.to_thread(self.client.models.list)
+            logger.info("🔥 Story Generator warmed up")
+        except Exception as e:
+            logger.warning(f"⚠️ Story Generator warmup failed (non-fatal): {e}")
+
+    @staticmethod
+    def _cache_key(
+        user_prompt: str,
+        story_length: str,
+        story_tone: str,
+        theme: Optional[str],
+        child_name: Optional[str]
+    ) -> str:
+        """Hash của request tuple đã normalize."""
+        raw = f"{user_prompt.strip().lower()}|{story_length}|{story_tone}|{theme}|{child_name}"
+        return hashlib.sha256(raw.encode()).hexdigest()
     
     def _expand_image_prompts(self, story_data: dict) -> dict:
         """
@@ -115,16 +153,26 @@ class StoryGenerator:
         """
         
         self.request_count += 1
-        
+
+        # ✅ CACHE CHECK (chỉ khi bật — demo/testing lặp lại cùng prompt)
+        cache_key = None
+        if settings.enable_story_cache:
+            cache_key = self._cache_key(user_prompt, story_length, story_tone, theme, child_name)
+            cached = self._cache.get(cache_key)
+            if cached and cached[0] > time.monotonic():
+                logger.info("⚡ Story cache HIT — skipping LLM call")
+                return copy.deepcopy(cached[1])
+            self._cache.pop(cache_key, None)  # expired
+
         # Get config
         config = get_scene_config(story_length)
-        num_scenes = config["num_scenes"]
-        
+        num_scenes = config.num_scenes
+
         # ✅ LOG CHÍNH XÁC
         logger.info(f"🎨 Generating {story_length}:")
         logger.info(f"   • Scenes: {num_scenes}")
-        logger.info(f"   • Words/scene: {config['words_per_scene_min']}-{config['words_per_scene_max']}")
-        logger.info(f"   • Target total: ~{config['target_words']} words")
+        logger.info(f"   • Words/scene: {config.words_per_scene_min}-{config.words_per_scene_max}")
+        logger.info(f"   • Target total: ~{config.target_words} words")
         
         # ✅ BUILD ENHANCED SYSTEM PROMPT với title uniqueness
         system_instruction = create_system_prompt(
@@ -214,8 +262,8 @@ class StoryGenerator:
                 is_valid, error_msg = self._validate_with_words_per_scene(
                     story_data,
                     expected_scenes=num_scenes,
-                    words_per_scene_min=config['words_per_scene_min'],
-                    words_per_scene_max=config['words_per_scene_max']
+                    words_per_scene_min=config.words_per_scene_min,
+                    words_per_scene_max=config.words_per_scene_max
                 )
                 
                 if not is_valid:
@@ -234,7 +282,16 @@ class StoryGenerator:
                 logger.info(f"   🎬 Scenes: {len(story_data['scenes'])}")
                 logger.info(f"   👤 Character: {story_data['character_design'][: 80]}...")
                 logger.info(f"   🌍 Background: {story_data['background_design'][:80]}...")
-                
+
+                if cache_key:
+                    # Evict entry cũ nhất khi đầy (dict giữ insertion order)
+                    if len(self._cache) >= settings.story_cache_size:
+                        self._cache.pop(next(iter(self._cache)))
+                    self._cache[cache_key] = (
+                        time.monotonic() + settings.story_cache_ttl,
+                        copy.deepcopy(story_data)
+                    )
+
                 return story_data
             
             except asyncio.TimeoutError:
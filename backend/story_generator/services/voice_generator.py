@@ -32,7 +32,16 @@ class VoiceGenerator:
             self.stt_client = speech.SpeechClient(credentials=credentials)
     logger.info("✅ Voice Generator initialized (Google Cloud TTS WaveNet)")
 
-    
+    async def warmup(self):
+        """Prime gRPC channel + OAuth token (best-effort, chạy lúc startup)."""
+        try:
+            await asyncio.to_thread(
+                self.tts_client.list_voices, language_code="en-US"
+            )
+            logger.info("🔥 Voice Generator warmed up")
+        except Exception as e:
+            logger.warning(f"⚠️ Voice Generator warmup failed (non-fatal): {e}")
+
     async def generate_audio(
         self,
         text: str,
@@ -23,7 +23,7 @@ class StepMetric:
     
     def finish(self) -> float:
         """Đánh dấu hoàn thành và tính duration."""
-        self.end_time = time.time()
+        self.end_time = time.perf_counter()
         self.duration = self.end_time - self.start_time
         return self.duration
 
@@ -57,7 +57,7 @@ class PerformanceTracker:
     
     def __init__(self, story_id: str):
         self.story_id = story_id
-        self. start_time = time.time()
+        self. start_time = time.perf_counter()
         self.steps: List[StepMetric] = []
         self.scene_metrics: Dict[int, SceneMetrics] = {}
         self.current_step: Optional[StepMetric] = None
@@ -65,7 +65,7 @@ class PerformanceTracker:
     @contextmanager
     def track_step(self, name: str, **metadata):
         """Context manager để track một bước xử lý."""
-        step = StepMetric(name=name, start_time=time.time(), metadata=metadata)
+        step = StepMetric(name=name, start_time=time.perf_counter(), metadata=metadata)
         self.current_step = step
         
         metadata_str = ", ".join(f"{k}={v}" for k, v in metadata.items())
@@ -87,7 +87,7 @@ class PerformanceTracker:
     
     def get_summary(self) -> Dict:
         """Tạo summary report đầy đủ."""
-        total_duration = time.time() - self.start_time
+        total_duration = time.perf_counter() - self.start_time
         
         # Group steps by name
         step_times = {}
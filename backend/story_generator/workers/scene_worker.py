@@ -12,12 +12,25 @@ NHIỆM VỤ:
 import asyncio
 import logging
 import time
+from story_generator.config import settings
 from story_generator.database import Database
 from story_generator.services.image_generator import ImageGenerator
-from story_generator.services.voice_generator import VoiceGenerator 
+from story_generator.services.voice_generator import VoiceGenerator
 
 logger = logging.getLogger(__name__)
 
+# Mỗi stage một semaphore riêng — image / audio / upload hit API khác nhau,
+# gate chung 1 counter sẽ head-of-line block giữa các stage
+IMAGE_SEM = asyncio.Semaphore(settings.image_concurrency)
+AUDIO_SEM = asyncio.Semaphore(settings.audio_concurrency)
+UPLOAD_SEM = asyncio.Semaphore(settings.upload_concurrency)
+
+
+async def with_sem(sem: asyncio.Semaphore, coro):
+    """Chạy coroutine dưới semaphore của stage tương ứng."""
+    async with sem:
+        return await coro
+
 
 async def generate_single_scene_worker(
     scene_data: dict,
@@ -42,15 +55,12 @@ async def generate_single_scene_worker(
     scene_id = db_scene["id"]
     
     # ✅ THÊM:  Timing variables
-    total_start = time.time()
+    total_start = time.perf_counter()
     try:
-        #logger.info(f"   🎨 Scene {scene_num} starting...")      
-        #1. Update status = generating
-        await db.update_scene_status(scene_id, "generating")
-        
-        gen_start = time.time()
-        
-        #2. Generate image + audio (parallel)
+        #logger.info(f"   🎨 Scene {scene_num} starting...")
+        gen_start = time.perf_counter()
+
+        #1. Generate image + audio (parallel)
         image_task = image_gen.generate_image(
             prompt=db_scene["image_prompt_used"],
             style=request_params.get("image_style"),
@@ -65,48 +75,45 @@ async def generate_single_scene_worker(
         )
         
         image_bytes, (audio_bytes, audio_duration, transcript) = await asyncio.gather(
-            image_task,
-            audio_task
+            with_sem(IMAGE_SEM, image_task),
+            with_sem(AUDIO_SEM, audio_task)
         )
-        
-        gen_end = time.time()
+
+        gen_end = time.perf_counter()
         gen_time = gen_end - gen_start
 
-        #3. Upload (parallel)
-        upload_start = time.time()
+        #2. Upload (parallel)
+        upload_start = time.perf_counter()
 
         image_path = f"{story_id}/scene_{scene_num}.webp"
         audio_path = f"{story_id}/scene_{scene_num}.mp3"
         
         image_url, audio_url = await asyncio.gather(
-            db.upload_file("story-images", image_path, image_bytes, "image/webp"),
-            db.upload_file("story-audio", audio_path, audio_bytes, "audio/mpeg")
+            with_sem(UPLOAD_SEM, db.upload_file("story-images", image_path, image_bytes, "image/webp")),
+            with_sem(UPLOAD_SEM, db.upload_file("story-audio", audio_path, audio_bytes, "audio/mpeg"))
         )
 
-        upload_end = time.time()
+        upload_end = time.perf_counter()
         upload_time = upload_end - upload_start
-        #4. Update scene database and đánh dấu Success
-        await asyncio.gather(
-            db.update_scene(scene_id, {
-                "image_url":  image_url,
-                "audio_url": audio_url,
-                "transcript": transcript,
-                "audio_duration": audio_duration, 
-            }),
-            db.update_scene_status(scene_id, "completed")
-        )
-        
-        # Update status = completed
-        #await db.update_scene_status(scene_id, "completed")
+        #3. Queue DB update — scenes xong gần nhau được gộp 1 UPSERT round trip
+        db.queue_scene_update({
+            **db_scene,
+            "image_url":  image_url,
+            "audio_url": audio_url,
+            "transcript": transcript,
+            "audio_duration": audio_duration,
+            "status": "completed",
+        })
+
         total_duration = gen_time + upload_time
 
-        # ✅ LOG DETAILED SUMMARY
-        logger.info(f"")
-        logger.info(f"⏱️  SCENE {scene_num}:")
-        logger.info(f"   • Generation (image+audio): {gen_time:.2f}s")
-        logger.info(f"   • Upload:                    {upload_time:.2f}s")
-        logger.info(f"   • Total:                     {total_duration:.2f}s")
-        logger.info(f"")
+        # ✅ LOG DETAILED SUMMARY (lazy %-formatting: khỏi build string nếu bị filter)
+        logger.info("")
+        logger.info("⏱️  SCENE %s:", scene_num)
+        logger.info("   • Generation (image+audio): %.2fs", gen_time)
+        logger.info("   • Upload:                    %.2fs", upload_time)
+        logger.info("   • Total:                     %.2fs", total_duration)
+        logger.info("")
         
         return {
             "scene_number": scene_num,
@@ -120,7 +127,7 @@ async def generate_single_scene_worker(
         }
         
     except Exception as e:
-        logger.error(f"   ❌ Scene {scene_num} FAILED: {e}")
+        logger.error("   ❌ Scene %s FAILED: %s", scene_num, e)
         
         # Mark as failed
         await db.update_scene_status(
@@ -150,18 +157,18 @@ async def generate_remaining_scenes(
     story_start_time: float = None
 ):
     """
-    Worker function - Tạo scenes 2-6 với PARALLEL PROCESSING.
-    
+    Worker function - Tạo scenes 2-N với PARALLEL PROCESSING.
+
     STRATEGY:
-    - Tạo 3 scenes cùng lúc (batch)
-    - Batch 1: scenes 2, 3, 4
-    - Batch 2: scenes 5, 6
-    
+    - Fan-out TẤT CẢ scenes còn lại, gate bằng Semaphore(scene_concurrency)
+    - Không chia batch cứng: scene xong là scene mới vào ngay,
+      không đợi scene chậm nhất của "batch" trước
+
     BENEFITS:
-    - Giảm thời gian từ ~30s xuống ~15s cho 6 scenes
+    - Tail latency: ceil(N/k) × t thay vì N × t
     - Tận dụng I/O concurrency
     - API calls song song
-    
+
     Args:
         story_id: ID của story
         scenes_data: List data từ Gemini
@@ -173,7 +180,7 @@ async def generate_remaining_scenes(
         voice_gen: VoiceGenerator instance
         db: Database instance
     """
-    worker_start_time = time.time()
+    worker_start_time = time.perf_counter()
     logger.info(f"🚀 Worker started: {story_id}")
     #logger.info(f"   Strategy:  Parallel batch processing (3 scenes per batch)")
     
@@ -189,34 +196,23 @@ async def generate_remaining_scenes(
             return
         
         # ==========================================
-        # PARALLEL BATCH PROCESSING
+        # PARALLEL FAN-OUT (bounded semaphore)
         # ==========================================
-        BATCH_SIZE = 5  # Tạo 5 scenes cùng lúc
-        
-        # Chia thành batches
-        batches = [
-            remaining[i:i + BATCH_SIZE] 
-            for i in range(0, len(remaining), BATCH_SIZE)
-        ]
-        
-        logger.info(f"   📦 Total batches:   {len(batches)}")
-        
-        for batch_idx, batch in enumerate(batches, 1):
-            batch_size = len(batch)
-            scene_numbers = [db_scene["scene_order"] for _, db_scene in batch]
-            
-            logger.info(f"")
-            logger.info(f"📦 BATCH {batch_idx}/{len(batches)}: Scenes {scene_numbers}")
-            #logger.info(f"   Processing {batch_size} scenes in parallel...")
-            
-            batch_start = time.time()
-            
-            # ==========================================
-            # TẠO TẤT CẢ SCENES TRONG BATCH SONG SONG
-            # ==========================================
-            tasks = []
-            for scene_data, db_scene in batch: 
-                task = generate_single_scene_worker(
+        sem = asyncio.Semaphore(settings.scene_concurrency)
+        scene_numbers = [db_scene["scene_order"] for _, db_scene in remaining]
+
+        logger.info(f"   📦 Fan-out {len(remaining)} scenes {scene_numbers} "
+                    f"(max {settings.scene_concurrency} concurrent)")
+
+        # Progress batching: 1 UPDATE mỗi 2 scenes hoặc sau 1s,
+        # thay vì 1 UPDATE mỗi scene (N round trips → ~N/2)
+        pending_progress = 0
+        last_flush = time.perf_counter()
+
+        async def run_scene(scene_data: dict, db_scene: dict) -> dict:
+            nonlocal completed_count, pending_progress, last_flush
+            async with sem:
+                result = await generate_single_scene_worker(
                     scene_data=scene_data,
                     db_scene=db_scene,
                     request_params=request_params,
@@ -227,45 +223,33 @@ async def generate_remaining_scenes(
                     voice_gen=voice_gen,
                     db=db
                 )
-                tasks.append(task)
-            
-            # Đợi TẤT CẢ scenes trong batch hoàn thành
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-            
-            batch_duration = time.time() - batch_start
-            
-            # ==========================================
-            # PROCESS RESULTS
-            # ==========================================
-            completed_in_batch = 0
-            failed_in_batch = 0
-            
-            for result in results: 
-                if isinstance(result, Exception):
-                    logger.error(f"   ❌ Task exception: {result}")
-                    failed_in_batch += 1
-                elif result["status"] == "completed":
-                    completed_in_batch += 1
-                else:
-                    failed_in_batch += 1
-            
-            # Update total completed count
-            completed_count += completed_in_batch + failed_in_batch
-            
-            # ==========================================
-            # UPDATE STORY PROGRESS
-            # ==========================================
+            # Đếm scene xong (completed HOẶC failed), flush theo batch
+            completed_count += 1
+            pending_progress += 1
+            if pending_progress >= 2 or time.perf_counter() - last_flush >= 1.0:
+                pending_progress = 0
+                last_flush = time.perf_counter()
+                await db.update_story_progress(story_id, completed_count, total_scenes)
+            return result
+
+        results = await asyncio.gather(
+            *(run_scene(sd, ds) for sd, ds in remaining),
+            return_exceptions=True
+        )
+
+        # Final flush: đảm bảo counter cuối cùng xuống DB
+        if pending_progress > 0:
             await db.update_story_progress(story_id, completed_count, total_scenes)
-            
-            # logger.info(f"")
-            # logger.info(f"✅ BATCH {batch_idx} DONE in {batch_duration:.2f}s")
-            # logger.info(f"   Completed: {completed_in_batch}/{batch_size}")
-            # logger.info(f"   Failed: {failed_in_batch}/{batch_size}")
-            # logger.info(f"   Overall progress: {completed_count}/{total_scenes}")
-        
+
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"   ❌ Task exception: {result}")
+
         # ==========================================
-        # ALL BATCHES COMPLETED
+        # ALL SCENES COMPLETED
         # ==========================================
+        # Đảm bảo các scene update còn buffer đã xuống DB trước khi chốt story
+        await db.flush_scene_updates()
         await db.update_story_status(story_id, "completed")
         
         logger.info(f"")
@@ -273,7 +257,7 @@ async def generate_remaining_scenes(
         logger.info(f"   Total scenes: {completed_count}/{total_scenes}")
         
         if story_start_time:
-            grand_total_time = time.time() - story_start_time
+            grand_total_time = time.perf_counter() - story_start_time
             logger.info(f"⏱️  ═══════════════════════════════════════════════════")
             logger.info(f"⏱️  🏁 GRAND TOTAL TIME: {grand_total_time:.2f}s")
             logger.info(f"⏱️     (From request start to all scenes completed)")
@@ -283,12 +267,6 @@ async def generate_remaining_scenes(
     except Exception as e:
         logger.error(f"❌ Worker CRITICAL FAILURE [{story_id}]: {e}", exc_info=True)
         
-        # Mark story as failed
-        await db.update_story_status(story_id, "failed")
-        
-        try:
-            await db.client. table("stories").update({
-                "error_message": str(e)
-            }).eq("id", story_id).execute()
-        except:
-            pass
\ No newline at end of file
+        # Mark story as failed (1 UPDATE gộp cả error_message;
+        # update_story_status đã tự log lỗi thay vì nuốt bằng bare except)
+        await db.update_story_status(story_id, "failed", error_message=str(e))
\ No newline at end of file